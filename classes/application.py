@@ -1,43 +1,125 @@
+import os
 import sys
-from typing import Optional
+from datetime import datetime
+from typing import Any, Optional
 import json
+import sqlite3
+import struct
 
+from classes.autosave import AutosaveStore
+from classes.binary_store import BINARY_EXTENSIONS, INTERVALS, BinaryStore
+from classes.clock import CLOCK, RolloverScheduler
 from classes.habit import BaseHabit
 from classes.filter import Filter
+from classes.habit_store import HabitStore
+from classes.periods import to_epoch_day
+from classes.shard_store import ShardStore
+from classes.sqlite_store import SQLITE_EXTENSIONS, SqliteStore
+from classes.storage import JsonStore, Store
 from helpers.text import underline, bold
 from ui.classes.graph import Graph
 
 
 class App:
     filter: Filter
-    longest_streak: Optional[str]
-    longest_negative: Optional[str]
     save_path: str
-    def __init__(self) -> None:
+    store: Optional[Store]
+    scheduler: RolloverScheduler
+    def __init__(self, store: Optional[Store] = None) -> None:
         self.filter = Filter({})
-        self.longest_streak = None
-        self.longest_negative = None
+        self.store = store
+        self.scheduler = RolloverScheduler(CLOCK.today(), INTERVALS)
+        if store:
+            self.save_path = store.path
+
+    @property
+    def longest_streak(self)->Optional[str]:
+        habit = self.filter.leader("longest_streak")
+        return habit.uid if habit else None
+
+    @property
+    def longest_negative(self)->Optional[str]:
+        habit = self.filter.leader("longest_negative")
+        return habit.uid if habit else None
+
+    def meta(self)->dict[str, Any]:
+        return {"longest_streak": self.longest_streak}
+
+    def get_store(self)->Store:
+        # apps created without get_or_init save to a plain json file
+        if not self.store:
+            self.store = JsonStore(self.save_path)
+        return self.store
 
     def save(self)->None:
-        data = {}
-        data["habits"] = {k: v.to_dict() for k, v in self.filter.base.items()}
-        data["longest_streak"] = self.longest_streak or None
+        self.get_store().save(self.filter.base, self.meta())
 
-        with open(self.save_path, "w+") as file:
-            json.dump(data, file)
+    async def save_async(self)->None:
+        await self.get_store().save_async(self.filter.base, self.meta())
+
+    def rollover(self, habits: list[BaseHabit], today: datetime)->None:
+        day = to_epoch_day(today)
+        for habit in habits:
+            habit.check_day(day)
+
+    def due_habits(self, now: datetime)->list[BaseHabit]:
+        '''
+        This method returns the habits of all intervals whose boundary passed since the last call.
+        Only the habits of those intervals have to be rolled over.
+        '''
+        habits = []
+        for interval in self.scheduler.due(now):
+            habits.extend(self.filter.lookup("interval", interval).values())
+        return habits
+
+    def commit(self, record: dict[str, Any])->None:
+        """
+        This method persists a single mutation through the store. Depending on the
+        store only the record is written (journal, sqlite) or the whole save file.
+
+        Args:
+            self (App)
+            record (dict): The mutation that was applied
+
+        Returns:
+            None
+        """
+        self.get_store().commit(self.filter.base, self.meta(), record)
 
     def add_habit(self, name: str, interval: str)->None:
         habit = BaseHabit.create(name, interval)
-        self.filter.base[habit.uid] = habit
+        habit.dirty = True
+        self.filter.add(habit)
+        self.commit({"op": "add", "habit": habit.to_dict()})
         self.filter.apply_filter()
-        self.save()
+
+    def remove_habit(self, uid: str)->None:
+        if self.filter.remove(uid) is None:
+            return
+        self.commit({"op": "remove", "uid": uid})
+
+    def toggle_habit(self, habit: BaseHabit)->None:
+        habit.toggle_completed()
+        self.commit({
+            "op": "toggle",
+            "uid": habit.uid,
+            "period": habit.start_day,
+            "completed": habit.completed,
+        })
+        self.filter.apply_filter()
+
+    def close(self)->None:
+        if self.store:
+            self.store.close()
 
     def habit_at_index(self, index: int)->Optional[BaseHabit]:
         # early return if index is out of range
-        filter_len = len(self.filter.tmp) 
-        if filter_len <= index or filter_len == 0:
+        if not 0 <= index < len(self.filter.tmp):
             return None
-        return list(self.filter.tmp.items())[index][1]
+        return self.filter.tmp.at(index)
+
+    def index_of(self, uid: str)->Optional[int]:
+        return self.filter.tmp.index_of(uid)
 
     def display_habits(self)->None:
         spacing = 4
@@ -77,14 +159,13 @@ class App:
         '''
         values = self.filter.tmp if use_filter else self.filter.base
 
-        if len(values) == 0:
+        current_streak = self.filter.leader("current_streak", use_filter)
+        longest_streak = self.filter.leader("longest_streak", use_filter)
+        current_negative = self.filter.leader("current_negative", use_filter)
+        longest_negative = self.filter.leader("longest_negative", use_filter)
+        if not (current_streak and longest_streak and current_negative and longest_negative):
             return
 
-        current_streak = max(values.values(), key=lambda obj: obj.current_streak)
-        longest_streak = max(values.values(), key=lambda obj: obj.longest_streak)
-        current_negative = max(values.values(), key=lambda obj: obj.current_negative)
-        longest_negative = max(values.values(), key=lambda obj: obj.longest_negative)
-
 
         print()
         if current_streak.current_streak > 0:
@@ -109,35 +190,47 @@ class App:
 
         Graph(values)
 
+    @staticmethod
+    def open_store(path: str, journal: bool = False, autosave: Optional[float] = None, lazy: bool = False) -> Store:
+        '''
+        This method chooses the store by the path: a directory (one file per habit), a sqlite
+        database (.db, .sqlite, .sqlite3), a binary save file (.bin) or a json file.
+        In journal mode snapshot mutations are appended to a journal. With `autosave`
+        json snapshots are written by a background thread, coalescing mutations for `autosave` seconds.
+        In lazy mode json and sqlite stores only load habit histories once they are accessed.
+        '''
+        if path.endswith(os.sep) or os.path.isdir(path):
+            return ShardStore(path)
+        if path.endswith(SQLITE_EXTENSIONS):
+            return SqliteStore(path, lazy)
+        if path.endswith(BINARY_EXTENSIONS):
+            return BinaryStore(path, journal)
+        if autosave is not None:
+            return AutosaveStore(path, autosave, lazy)
+        return JsonStore(path, journal, lazy)
+
     @classmethod
-    def get_or_init(cls, path) -> "App":
+    def get_or_init(
+        cls, path, journal: bool = False, autosave: Optional[float] = None, lazy: bool = False, columnar: bool = False
+    ) -> "App":
         '''
-        This method initializes an app either using provied savedata or from scratch
+        This method initializes an app either using provied savedata or from scratch.
+        See App.open_store for the available stores. With `columnar` the habits are kept in a HabitStore.
         '''
-        app = cls()
-        app.save_path = path
+        store = cls.open_store(path, journal, autosave, lazy)
+        app = cls(store)
         try:
-            with open(app.save_path, "r") as file:
-                data = json.load(file)
-                app.filter.populate({k: BaseHabit.from_dict(v) for k, v in data.get("habits", {}).items()})
-                longest_overall = max(app.filter.base.items(), key=lambda item: item[1].longest_streak)
-                app.longest_streak = app.longest_streak or longest_overall[0]
-                if streak := app.filter.base.get(app.longest_streak, longest_overall[1]):
-                    if streak != longest_overall[1] and longest_overall[1].longest_streak > streak.longest_streak:
-                        cls.longest_streak = longest_overall[0]
-
-                longest_overall_neg = max(app.filter.base.items(), key=lambda item: item[1].longest_negative)
-                app.longest_negative = app.longest_negative or longest_overall_neg[0]
-                if streak := app.filter.base.get(app.longest_negative, longest_overall_neg[1]):
-                    if streak != longest_overall_neg[1] and longest_overall_neg[1].longest_negative > streak.longest_negative:
-                        cls.longest_streak = longest_overall[0]
-                    
-                app.filter.apply_sorting()
-
-        except FileNotFoundError:
-            # we just init a new app if no savedata is found
-            pass
+            habits, _ = store.load()
         except json.JSONDecodeError:
             print("Save data could not be parsed")
             sys.exit(1)
+        except sqlite3.DatabaseError:
+            print("Save database could not be read")
+            sys.exit(1)
+        except (ValueError, struct.error):
+            print("Save data could not be unpacked")
+            sys.exit(1)
+
+        app.filter.populate(HabitStore(habits) if columnar else habits)
+        app.filter.apply_sorting()
         return app
@@ -0,0 +1,174 @@
+from typing import Any, Optional
+import asyncio
+import json
+import threading
+import time
+
+from classes.habit import BaseHabit
+from classes.storage import JsonStore
+from helpers.files import atomic_write
+
+
+class AutosaveStore(JsonStore):
+    """
+    A json store that writes in a background thread. Mutations only capture a
+    serialized copy of the changed habit on the calling thread, the worker
+    coalesces them for `window` seconds and then writes the whole snapshot
+    atomically. The UI thread never waits for disk I/O, except on flush.
+    """
+    window: float
+    snapshot: dict[str, dict[str, Any]]
+    meta: dict[str, Any]
+    pending: dict[str, Optional[dict[str, Any]]]
+    pending_meta: dict[str, Any]
+    generation: int
+    written: int
+    flushing: bool
+    stopped: bool
+    error: Optional[Exception]
+    condition: threading.Condition
+    thread: threading.Thread
+
+    def __init__(self, path: str, window: float = 0.5, lazy: bool = False) -> None:
+        super().__init__(path, lazy=lazy)
+        self.window = window
+        self.snapshot = {}
+        self.meta = {}
+        self.pending = {}
+        self.pending_meta = {}
+        self.generation = 0
+        self.written = 0
+        self.flushing = False
+        self.stopped = False
+        self.error = None
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.run, name="autosave", daemon=True)
+        self.thread.start()
+
+    def read_snapshot(self) -> tuple[dict[str, BaseHabit], dict[str, Any], int]:
+        data = self.read()
+        habits, meta, seq = self.parse(data)
+        # untouched habits are written back as they were read
+        self.snapshot = dict(data.get("habits", {}))
+        self.meta = dict(meta)
+        return habits, meta, seq
+
+    def commit(self, habits: dict[str, BaseHabit], meta: dict[str, Any], record: dict[str, Any]) -> None:
+        """
+        This method queues a mutation for the worker. Only the affected habit is serialized.
+
+        Args:
+            self (AutosaveStore)
+            habits (dict[str, BaseHabit]): All habits by uid, already containing the mutation
+            meta (dict): App wide meta data
+            record (dict): The mutation
+
+        Returns:
+            None
+        """
+        with self.condition:
+            match record.get("op"):
+                case "add":
+                    self.pending[record["habit"]["uid"]] = record["habit"]
+                case "remove":
+                    self.pending[record["uid"]] = None
+                case _:
+                    if habit := habits.get(record.get("uid", "")):
+                        self.pending[habit.uid] = habit.to_dict()
+            self.pending_meta = dict(meta)
+            self.generation += 1
+            self.condition.notify_all()
+
+    def run(self) -> None:
+        """
+        This method is the worker loop. It waits for pending mutations, coalesces
+        everything that arrives within the window and writes the snapshot.
+
+        Args:
+            self (AutosaveStore)
+
+        Returns:
+            None
+        """
+        while True:
+            with self.condition:
+                while not self.pending and not self.stopped:
+                    self.condition.wait()
+                if not self.pending:
+                    return
+
+                deadline = time.monotonic() + self.window
+                while not self.flushing and not self.stopped:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+
+                pending, self.pending = self.pending, {}
+                meta = self.pending_meta
+                generation = self.generation
+
+            for uid, data in pending.items():
+                if data is None:
+                    self.snapshot.pop(uid, None)
+                else:
+                    self.snapshot[uid] = data
+            self.meta = meta
+
+            try:
+                self.write()
+            except OSError as e:
+                self.error = e
+
+            with self.condition:
+                self.written = generation
+                self.condition.notify_all()
+
+    def write(self) -> None:
+        data = {"habits": self.snapshot}
+        data.update(self.meta)
+        atomic_write(self.path, json.dumps(data))
+
+    def flush(self) -> None:
+        """
+        This method blocks until all queued mutations are written
+
+        Args:
+            self (AutosaveStore)
+
+        Returns:
+            None
+        """
+        with self.condition:
+            self.flushing = True
+            self.condition.notify_all()
+            while self.written < self.generation and self.thread.is_alive():
+                self.condition.wait()
+            self.flushing = False
+
+        if self.error:
+            error, self.error = self.error, None
+            raise error
+
+    def save(self, habits: dict[str, BaseHabit], meta: dict[str, Any]) -> None:
+        # the worker is idle after the flush, so the snapshot can be replaced here
+        self.flush()
+        self.snapshot = {k: v.to_dict() for k, v in habits.items()}
+        self.meta = dict(meta)
+        self.write()
+
+    def backlog(self) -> int:
+        return self.generation - self.written
+
+    async def save_async(self, habits: dict[str, BaseHabit], meta: dict[str, Any]) -> None:
+        # mutations are written by the worker already, only wait for it
+        await asyncio.to_thread(self.flush)
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            with self.condition:
+                self.stopped = True
+                self.condition.notify_all()
+            self.thread.join()
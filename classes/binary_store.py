@@ -0,0 +1,169 @@
+from functools import partial
+from typing import Any, Optional
+import json
+import mmap
+import struct
+import uuid
+
+from classes.habit import BaseHabit
+from classes.history import History
+from classes.storage import SnapshotStore, Store
+
+BINARY_EXTENSIONS = (".bin",)
+
+MAGIC = b"HABT"
+VERSION = 1
+
+# magic, version, number of habits, offsets of the string table, the bitmaps and the meta data, meta data length, journal seq
+HEADER = struct.Struct("<4sHxxIQQQIQ")
+# uid, interval code, completed, start (epoch day), name offset, name length, bitmap offset, history length,
+# completions, current streak, longest streak, current negative, longest negative, closed streak, closed negative, previous run
+RECORD = struct.Struct("<16sBBxxiIIQ9I")
+
+INTERVALS = ("daily", "weekly", "monthly")
+
+
+def dump(habits: dict[str, BaseHabit], meta: dict[str, Any], seq: int = 0) -> bytes:
+    """
+    This function packs habits into the binary save format:
+    a fixed size header, a table of fixed size records, a string table with the
+    names, the packed history bitmaps and the meta data as json.
+
+    Args:
+        habits (dict[str, BaseHabit]): All habits by uid
+        meta (dict): App wide meta data
+        seq (int): The journal sequence number contained in the snapshot
+
+    Returns:
+        data (bytes): The packed save file
+    """
+    records = bytearray()
+    strings = bytearray()
+    bitmaps = bytearray()
+    for habit in habits.values():
+        name = habit.name.encode("utf-8")
+        bits = habit.history.bits
+        records += RECORD.pack(
+            uuid.UUID(habit.uid).bytes,
+            INTERVALS.index(habit.interval),
+            habit.completed,
+            habit.start_day,
+            len(strings),
+            len(name),
+            len(bitmaps),
+            len(habit.history),
+            habit.completions,
+            habit.current_streak,
+            habit.longest_streak,
+            habit.current_negative,
+            habit.longest_negative,
+            habit.closed_streak,
+            habit.closed_negative,
+            habit.previous_run,
+        )
+        strings += name
+        bitmaps += bits
+
+    meta_data = json.dumps(meta).encode("utf-8")
+    strings_offset = HEADER.size + len(records)
+    bitmaps_offset = strings_offset + len(strings)
+    meta_offset = bitmaps_offset + len(bitmaps)
+    header = HEADER.pack(
+        MAGIC, VERSION, len(habits), strings_offset, bitmaps_offset, meta_offset, len(meta_data), seq
+    )
+    return b"".join((header, records, strings, bitmaps, meta_data))
+
+
+def load(buffer: memoryview) -> tuple[dict[str, BaseHabit], dict[str, Any], int]:
+    """
+    This function unpacks the binary save format. Histories are views into
+    `buffer` and only copied once a habit is mutated.
+
+    Args:
+        buffer (memoryview): The packed save file
+
+    Returns:
+        (habits, meta, seq)((dict[str, BaseHabit], dict, int)): The habits by uid, meta data and journal sequence number
+    """
+    magic, version, count, strings_offset, bitmaps_offset, meta_offset, meta_len, seq = HEADER.unpack_from(buffer)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("not a habit save file")
+
+    habits = {}
+    records = buffer[HEADER.size:HEADER.size + count * RECORD.size]
+    for record in RECORD.iter_unpack(records):
+        (
+            uid, interval, completed, start, name_offset, name_len, bitmap_offset, length, completions,
+            *streaks,
+        ) = record
+        name_start = strings_offset + name_offset
+        habit = BaseHabit.create(str(buffer[name_start:name_start + name_len], "utf-8"), INTERVALS[interval])
+        habit.uid = str(uuid.UUID(bytes=uid))
+        habit.completed = completed
+        habit.start_day = start
+        (
+            habit.current_streak,
+            habit.longest_streak,
+            habit.current_negative,
+            habit.longest_negative,
+            habit.closed_streak,
+            habit.closed_negative,
+            habit.previous_run,
+        ) = streaks
+        bitmap_start = bitmaps_offset + bitmap_offset
+        bits = buffer[bitmap_start:bitmap_start + (length + 7) // 8]
+        habit.set_history_loader(partial(History.view, bits, length), length, completions)
+        habits[habit.uid] = habit
+
+    meta = json.loads(bytes(buffer[meta_offset:meta_offset + meta_len]))
+    return habits, meta, seq
+
+
+class BinaryStore(SnapshotStore):
+    """
+    Stores the snapshot in the binary save format. The file is memory mapped,
+    so loading neither parses nor copies the histories.
+    """
+    mapping: Optional[mmap.mmap]
+
+    def __init__(self, path: str, journal: bool = False) -> None:
+        super().__init__(path, journal)
+        self.mapping = None
+
+    def read_snapshot(self) -> tuple[dict[str, BaseHabit], dict[str, Any], int]:
+        try:
+            with open(self.path, "rb") as file:
+                self.mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            # missing or empty file, we just start from scratch
+            return {}, {}, 0
+        return load(memoryview(self.mapping))
+
+    def dump_snapshot(self, habits: dict[str, BaseHabit], meta: dict[str, Any], seq: int) -> bytes:
+        # the old mapping stays valid, the new file is renamed over the old one
+        return dump(habits, meta, seq)
+
+    def close(self) -> None:
+        super().close()
+        if self.mapping:
+            try:
+                self.mapping.close()
+            except BufferError:
+                # habits still reference their histories, the mapping is closed once they are gone
+                pass
+
+
+def convert(source: Store, target: Store) -> int:
+    """
+    This function copies all habits from one store into another, e.g. from json to the binary format
+
+    Args:
+        source (Store): The store to read from
+        target (Store): The store to write to
+
+    Returns:
+        count (int): The number of converted habits
+    """
+    habits, meta = source.load()
+    target.save(habits, meta)
+    return len(habits)
@@ -0,0 +1,83 @@
+import heapq
+from datetime import datetime
+from typing import Callable, Iterable
+
+from classes.periods import from_epoch_day, period_index, period_start, to_epoch_day
+
+
+class Clock:
+    """
+    The source of the current date. Long running processes must not keep a date
+    around, they ask the clock instead. Tests can replace `now` to travel in time.
+    """
+    now: Callable[[], datetime]
+
+    def __init__(self, now: Callable[[], datetime] = datetime.today) -> None:
+        self.now = now
+
+    def today(self) -> datetime:
+        return self.now()
+
+    def day(self) -> int:
+        # the current epoch day, see classes.periods
+        return to_epoch_day(self.now())
+
+
+CLOCK = Clock()
+
+
+def next_boundary(interval: str, now: datetime) -> datetime:
+    """
+    This function returns the start of the next interval, i.e. the time the habits of that interval roll over
+
+    Args:
+        interval (str): "daily", "weekly" or "monthly"
+        now (datetime): The current time
+
+    Returns:
+        boundary (datetime): Midnight of the next day, monday or first day of the month
+    """
+    return from_epoch_day(period_start(interval, period_index(interval, to_epoch_day(now)) + 1))
+
+
+class RolloverScheduler:
+    """
+    Knows when the habits of each interval roll over next. The boundaries are kept in a
+    heap, so finding the due intervals costs nothing until the earliest boundary passed.
+    """
+    heap: list[tuple[datetime, str]]  # (next boundary, interval)
+
+    def __init__(self, now: datetime, intervals: Iterable[str]) -> None:
+        self.heap = [(next_boundary(interval, now), interval) for interval in intervals]
+        heapq.heapify(self.heap)
+
+    def delay(self, now: datetime) -> float:
+        """
+        This method returns the time until the next rollover
+
+        Args:
+            self (RolloverScheduler)
+            now (datetime): The current time
+
+        Returns:
+            seconds (float): The seconds until the earliest boundary, 0 if it passed already
+        """
+        return max(0.0, (self.heap[0][0] - now).total_seconds())
+
+    def due(self, now: datetime) -> list[str]:
+        """
+        This method returns the intervals whose boundary passed and schedules their next one
+
+        Args:
+            self (RolloverScheduler)
+            now (datetime): The current time
+
+        Returns:
+            intervals (list[str]): The intervals whose habits have to be rolled over
+        """
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            _, interval = heapq.heappop(self.heap)
+            due.append(interval)
+            heapq.heappush(self.heap, (next_boundary(interval, now), interval))
+        return due
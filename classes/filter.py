@@ -1,20 +1,85 @@
-from typing import Optional
+from collections.abc import Mapping
+from operator import attrgetter
+from typing import Any, Callable, Iterator, Optional
 from classes.habit import BaseHabit
+from classes.sorted_view import SortedView
+
+# attributes that are indexed by default, they have to be observed (see habit.observed)
+INDEXED = ("interval", "completed")
+
+# sorters and their keys, every sorter can be suffixed with "_desc"
+SORT_KEYS: dict[str, Callable[[BaseHabit], Any]] = {
+    "name": lambda habit: habit.name,
+    "completion": lambda habit: habit.completed,
+    "longest_streak": lambda habit: habit.longest_streak,
+    "comp_rate": lambda habit: habit.completion_rate(),
+    "rate_7": lambda habit: habit.window_rate(7),
+    "rate_30": lambda habit: habit.window_rate(30),
+    "rate_90": lambda habit: habit.window_rate(90),
+}
+
+# stats with a leaderboard, best first
+LEADERBOARDS = ("current_streak", "longest_streak", "current_negative", "longest_negative")
+
+class IndexBucket(Mapping):
+    """
+    The habits with one value of an indexed attribute. Buckets only keep the uids and look
+    the habits up in the base, so containers like the HabitStore don't need an object per habit.
+    """
+    __slots__ = ("base", "uids")
+    base: Mapping[str, BaseHabit]
+    uids: dict[str, None]  # ordered like a set
+
+    def __init__(self, base: Mapping[str, BaseHabit]) -> None:
+        self.base = base
+        self.uids = {}
+
+    def __len__(self) -> int:
+        return len(self.uids)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.uids)
+
+    def __contains__(self, uid: object) -> bool:
+        return uid in self.uids
+
+    def __getitem__(self, uid: str) -> BaseHabit:
+        if uid not in self.uids:
+            raise KeyError(uid)
+        return self.base[uid]
+
+    def add(self, uid: str) -> None:
+        self.uids[uid] = None
+
+    def discard(self, uid: str) -> None:
+        self.uids.pop(uid, None)
+
 
 class Filter:
     base: dict[str, BaseHabit]
-    tmp: dict[str, BaseHabit]
+    # the filtered and sorted habits
+    tmp: SortedView
     sorter: str
     filter: str
+    # attribute -> value -> habits with that value, kept up to date through the habit observers
+    indexes: dict[str, dict[Any, IndexBucket]]
+    # all habits and the habits of the current filter ordered by their stats, see LEADERBOARDS.
+    # They are built on first use and kept up to date afterwards
+    leaderboards: dict[str, SortedView]
+    filtered_leaderboards: dict[str, SortedView]
     def __init__(self, habits: dict[str, BaseHabit]) -> None:
-        self.base = habits
-        self.tmp = habits
         self.sorter = "name"
         self.filter = "all"
+        self.indexes = {attribute: {} for attribute in INDEXED}
+        self.tmp = SortedView({}, SORT_KEYS["name"])
+        self.leaderboards = {}
+        self.filtered_leaderboards = {}
+        self.populate(habits)
 
     def populate(self, habits: dict[str, BaseHabit])->None:
         """
-        This method sets the base and temporary to the new provided habit dict
+        This method sets the base to the new provided habit dict, rebuilds the indexes and
+        leaderboards and applies the current filter
 
         Args:
             habits dict[str, BaseHabit]: New habits
@@ -23,90 +88,147 @@ class Filter:
             None
         """
         self.base = habits
-        self.tmp = habits
+        for attribute in self.indexes:
+            self.indexes[attribute] = {}
+        for habit in habits.values():
+            self._index(habit)
+        source = self._source(self.filter)
+        self.tmp = SortedView(habits if source is None else source, self.tmp.key, self.tmp.reverse)
+        self.leaderboards = {}
+        self.filtered_leaderboards = {}
 
-    # SORTERS
-    def apply_sorting(self, sorter: Optional[str] = None):
+    def add(self, habit: BaseHabit)->None:
+        self.base[habit.uid] = habit
+        # containers like the HabitStore may store a different object
+        habit = self.base[habit.uid]
+        self._index(habit)
+        if habit.uid in self.tmp.source:
+            self.tmp.add(habit)
+            for leaderboard in self.filtered_leaderboards.values():
+                leaderboard.add(habit)
+        for leaderboard in self.leaderboards.values():
+            leaderboard.add(habit)
+
+    def remove(self, uid: str)->Optional[BaseHabit]:
+        habit = self.base.pop(uid, None)
+        if habit is not None:
+            for attribute, index in self.indexes.items():
+                index[getattr(habit, attribute)].discard(uid)
+            self.tmp.discard(uid)
+            for leaderboard in (*self.leaderboards.values(), *self.filtered_leaderboards.values()):
+                leaderboard.discard(uid)
+        return habit
+
+    def top(self, stat: str, filtered: bool = False)->Iterator[BaseHabit]:
         """
-        This method either applies a new sorting or the saved one if none is provided
+        This method yields the habits with the highest value of a stat first.
+        The first k habits cost O(k), except for building the leaderboard on first use.
 
         Args:
-            sorter (Optional[str]): the sorter to be applied. Defaults to self.sorter
+            stat (str): One of LEADERBOARDS
+            filtered (bool): Whether only habits of the current filter are yielded
 
         Returns:
-            None
+            habits (Iterator[BaseHabit]): The habits, best first
         """
-        sorter = sorter or self.sorter
-        match sorter:
-            case "name":
-                self._sort_by_name()
-            case "name_desc":
-                self._sort_by_name(True)
-            case "completion":
-                self._sort_by_completion()
-            case "completion_desc":
-                self._sort_by_completion(True)
-            case "longest_streak":
-                self._sort_by_streak()
-            case "longest_streak_desc":
-                self._sort_by_streak(True)
-            case "comp_rate":
-                self._sort_by_comp_rate()
-            case "comp_rate_desc":
-                self._sort_by_comp_rate(True)
-            case _:
-                return
+        leaderboards, source = (self.filtered_leaderboards, self.tmp.source) if filtered else (self.leaderboards, self.base)
+        leaderboard = leaderboards.get(stat)
+        if leaderboard is None:
+            leaderboard = leaderboards[stat] = SortedView(source, attrgetter(stat), reverse=True)
+        return iter(leaderboard.values())
 
-        self.sorter = sorter
+    def leader(self, stat: str, filtered: bool = False)->Optional[BaseHabit]:
+        return next(self.top(stat, filtered), None)
 
-    def _sort_by_name(self, rev: bool = False)->Optional[dict[str, BaseHabit]]:
+    def add_index(self, attribute: str)->None:
         """
+        This method indexes the habits by another attribute. The attribute has to notify
+        the observer of the habit on changes, see habit.observed
+
         Args:
-            rev (bool): specifies the order in which the sorting should be applied
+            attribute (str): The name of the attribute
 
         Returns:
             None
         """
-        tmp = dict(sorted(self.tmp.items(), key=lambda item: item[1].name, reverse=rev))
-        return tmp
+        self.indexes[attribute] = {}
+        for habit in self.base.values():
+            self.lookup(attribute, getattr(habit, attribute)).add(habit.uid)
 
-    def _sort_by_completion(self, rev: bool = False)->Optional[dict[str, BaseHabit]]:
+    def lookup(self, attribute: str, value: Any)->IndexBucket:
         """
+        This method returns all habits with the given attribute value. The result is the
+        index bucket itself, so it follows later changes of the habits.
+
         Args:
-            rev (bool): specifies the order in which the sorting should be applied
+            attribute (str): An indexed attribute
+            value (Any): The value
 
         Returns:
-            None
+            habits (IndexBucket): The matching habits
         """
-        tmp = dict(sorted(self.tmp.items(), key=lambda item: item[1].completed, reverse=rev))
-        return tmp
+        index = self.indexes[attribute]
+        bucket = index.get(value)
+        if bucket is None:
+            bucket = index[value] = IndexBucket(self.base)
+        return bucket
 
-    def _sort_by_comp_rate(self, rev: bool = False)->Optional[dict[str, BaseHabit]]:
-        """
-        Args:
-            rev (bool): specifies the order in which the sorting should be applied
+    def _index(self, habit: BaseHabit)->None:
+        habit.observer = self.on_change
+        for attribute in self.indexes:
+            self.lookup(attribute, getattr(habit, attribute)).add(habit.uid)
 
-        Returns:
-            None
-        """
-        tmp = dict(sorted(self.tmp.items(), key=lambda item: (sum(item[1].history) / len(item[1].history)), reverse=rev))
-        return tmp
+    def on_change(self, habit: BaseHabit, attribute: str, old: Any)->None:
+        # moves the habit to the bucket of its new value and to its new position in the current view
+        uid = habit.uid
+        if uid not in self.base:
+            return
+        index = self.indexes.get(attribute)
+        if index is not None:
+            if old in index:
+                index[old].discard(uid)
+            self.lookup(attribute, getattr(habit, attribute)).add(uid)
+
+        if uid in self.tmp.source:
+            self.tmp.add(habit)
+            for leaderboard in self.filtered_leaderboards.values():
+                leaderboard.update(habit)
+        else:
+            self.tmp.discard(uid)
+            for leaderboard in self.filtered_leaderboards.values():
+                leaderboard.discard(uid)
+        for leaderboard in self.leaderboards.values():
+            leaderboard.update(habit)
 
-    def _sort_by_streak(self, rev: bool = False)->Optional[dict[str, BaseHabit]]:
+    # SORTERS
+    def apply_sorting(self, sorter: Optional[str] = None):
         """
+        This method either applies a new sorting or the saved one if none is provided.
+        Changing only the direction reuses the current order.
+
         Args:
-            rev (bool): specifies the order in which the sorting should be applied
+            sorter (Optional[str]): the sorter to be applied. Defaults to self.sorter
 
         Returns:
             None
         """
-        tmp = dict(sorted(self.tmp.items(), key=lambda item: item[1].longest_streak, reverse=rev))
-        return tmp
+        sorter = sorter or self.sorter
+        key = SORT_KEYS.get(sorter.removesuffix("_desc"))
+        if key is None:
+            return
+
+        reverse = sorter.endswith("_desc")
+        if self.tmp.key is key:
+            self.tmp.reverse = reverse
+        else:
+            self.tmp = SortedView(self.tmp.source, key, reverse)
+        self.sorter = sorter
 
     # FILTERS
     def apply_filter(self, filter: Optional[str] = None):
         """
-        This method either applies a new filter or the saved one if none is provided
+        This method either applies a new filter or the saved one if none is provided.
+        Filters are index lookups, they don't scan the habits.
 
         Args:
             filter (Optional[str]): the filter to be applied. Defaults to self.filter
@@ -116,37 +238,31 @@ class Filter:
         """
         filter = filter or self.filter
         filter = filter.lower()
-        match filter:
-            case "all":
-                self.tmp = self.base
-            case "completed":
-                self._filter_completed(True)
-            case "incomplete":
-                self._filter_completed(False)
-
-            case "daily" | "weekly" | "monthly":
-                self._filter_interval(filter)
-            case _: 
-                return
+        source = self._source(filter)
+        if source is None:
+            return
 
         self.filter = filter
+        # the current view is kept up to date, it only has to be rebuilt for other habits
+        if source is not self.tmp.source:
+            self.tmp = SortedView(source, self.tmp.key, self.tmp.reverse)
+            self.filtered_leaderboards = {}
 
-    def _filter_completed(self, completed: bool = False):
-        """
-        Args:
-            completed (bool): if the filter should filter completed or incomplete habits
-
-        Returns:
-            None
-        """
-        self.tmp = {k: v for k, v in self.base.items() if v.completed == completed}
-
-    def _filter_interval(self, interval: str):
+    def _source(self, filter: str)->Optional[Mapping[str, BaseHabit]]:
         """
         Args:
-            interval (str): the interval that should be filtered by
+            filter (str): the filter
 
         Returns:
-            None
+            habits (Optional[Mapping[str, BaseHabit]]): the habits matching the filter, None for unknown filters
         """
-        self.tmp = {k: v for k, v in self.base.items() if v.interval == interval}
+        match filter:
+            case "all":
+                return self.base
+            case "completed":
+                return self.lookup("completed", 1)
+            case "incomplete":
+                return self.lookup("completed", 0)
+            case "daily" | "weekly" | "monthly":
+                return self.lookup("interval", filter)
+        return None
@@ -1,41 +1,220 @@
-from datetime import datetime, timedelta
-from typing import Any, List
-from abc import ABC, abstractmethod
+from datetime import datetime
+from functools import partial
+from typing import Any, Callable, Optional
+from abc import ABC
 import uuid
 
-from constants import DEBUG, DATEFORMAT, TODAY
-from helpers.text import green, percentage_gradient, red, underline
+from classes.clock import CLOCK
+from classes.history import History
+from classes.history_strip import HistoryStrip
+from classes.periods import from_epoch_day, parse_day, period_index, period_start, to_epoch_day
+from constants import DEBUG
+from helpers.text import percentage_gradient, underline
+
+# window sizes (in intervals) of the completion rates shown by inspect_self
+RATE_WINDOWS = (7, 30, 90)
+BEST_WINDOW = 30
+
+
+class CacheStats:
+    """
+    Counts the hits and misses of the aggregate caches of all habits
+    """
+    hits: int
+    misses: int
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __str__(self) -> str:
+        return f"{self.hit_rate():.1%} ({self.hits} hits, {self.misses} misses)"
+
+
+CACHE_STATS = CacheStats()
+
+
+def observed(name: str) -> property:
+    """
+    This function creates an attribute that notifies the observer of the habit
+    whenever its value changes, e.g. to keep the indexes of a Filter up to date
+
+    Args:
+        name (str): The name of the attribute, the value is stored as `_<name>`
+
+    Returns:
+        attribute (property): The attribute
+    """
+    private = f"_{name}"
+
+    def get(self: "BaseHabit") -> Any:
+        return getattr(self, private)
+
+    def set(self: "BaseHabit", value: Any) -> None:
+        old = getattr(self, private)
+        setattr(self, private, value)
+        if self.observer and old != value:
+            self.observer(self, name, old)
+
+    return property(get, set)
 
 
 class BaseHabit(ABC):
     # Attributes
     name: str
     uid: str
-    completed: int
+    _completed: int
     longest_streak: int
     longest_negative: int
     current_negative: int
     current_streak: int
     interval: str
-    start: datetime
-    history: List[int]
+    start_day: int  # epoch day the current interval started at, see classes.periods
+    completions: int  # number of completed intervals
+    periods: int  # number of intervals, i.e. the length of the history
+
+    # The history is loaded on first access if a loader is set, zeros appended
+    # in the meantime are kept in `pending_zeros`
+    _history: Optional[History]
+    history_loader: Optional[Callable[[], History]]
+    history_payload: Optional[str]  # the persisted base64 history, reused by to_dict until it is loaded
+    pending_zeros: int
+
+    # Run state for incremental streak updates
+    closed_streak: int  # longest positive run, excluding the current run
+    closed_negative: int  # longest negative run, excluding the current run
+    previous_run: int  # length of the run before the current one
+
+    # Set on every mutation, cleared once the habit was persisted
+    dirty: bool
+
+    # Called with (habit, attribute, old value) when an observed attribute changes
+    observer: Optional[Callable[["BaseHabit", str, Any], None]]
+
+    # Bumped on every mutation, derived values are cached until the next bump
+    generation: int
+    cache: Optional[dict[Any, Any]]
+    cache_generation: int
+    # Rendered histories by (prefix, max_rows), they are updated in place on appends and toggles
+    strips: Optional[dict[tuple[str, int], HistoryStrip]]
 
     # Formatting
     num_intervals: int
 
+    completed = observed("completed")
+
     def __init__(self, name: str, interval: str) -> None:
         self.name = name
         self.uid = str(uuid.uuid4())
         self.interval = interval
+        self.observer = None
+        self._completed = 0
 
         self.longest_streak = 0
         self.current_streak = 0
-        self.longest_negative = 1
-        self.current_negative = 1
-        self.history = []
+        self.longest_negative = 0
+        self.current_negative = 0
+        self.closed_streak = 0
+        self.closed_negative = 0
+        self.previous_run = 0
+        self.generation = 0
+        self.cache = None
+        self.cache_generation = 0
+        self.strips = None
+        self.history = History()
 
         self.reset()
 
+    @property
+    def history(self) -> History:
+        if self._history is None:
+            history = self.history_loader() if self.history_loader else History()
+            history.extend(0, self.pending_zeros)
+            self.history = history
+            return history
+        return self._history
+
+    @history.setter
+    def history(self, history: History) -> None:
+        self._history = history
+        self.history_loader = None
+        self.history_payload = None
+        self.pending_zeros = 0
+        self.periods = len(history)
+        self.completions = history.count()
+        self.invalidate()
+
+    def set_history_loader(
+        self, loader: Callable[[], History], periods: int, completions: int, payload: Optional[str] = None
+    ) -> None:
+        """
+        This method defers loading the history until it is first accessed
+
+        Args:
+            self (Habit)
+            loader (Callable[[], History]): Returns the persisted history
+            periods (int): The length of the persisted history
+            completions (int): The number of completed intervals in the persisted history
+            payload (Optional[str]): The persisted history in base64, see History.to_base64.
+                If given, to_dict writes it back without loading the history
+
+        Returns:
+            None
+        """
+        self._history = None
+        self.history_loader = loader
+        self.history_payload = payload
+        self.pending_zeros = 0
+        self.periods = periods
+        self.completions = completions
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        # called at the end of every mutation, the observer may re-read derived values, e.g. to re-sort
+        self.generation += 1
+        if self.observer:
+            self.observer(self, "generation", self.generation - 1)
+
+    def cached(self, key: Any, compute: Callable[[], Any]) -> Any:
+        """
+        This method returns a derived value from the aggregate cache. The cache is
+        dropped whenever the generation changed, i.e. after every mutation.
+
+        Args:
+            self (Habit)
+            key (Any): The key of the value, e.g. ("window_rate", 30)
+            compute (Callable[[], Any]): Computes the value on a miss
+
+        Returns:
+            value (Any): The cached or computed value
+        """
+        if self.cache is None or self.cache_generation != self.generation:
+            self.cache = {}
+            self.cache_generation = self.generation
+        if key in self.cache:
+            CACHE_STATS.hits += 1
+            return self.cache[key]
+
+        CACHE_STATS.misses += 1
+        value = self.cache[key] = compute()
+        return value
+
+    def update_strips(self, update: Callable[[HistoryStrip], None]) -> None:
+        # called right before invalidate, so up to date strips stay valid for the next generation
+        if not self.strips:
+            return
+        for strip in self.strips.values():
+            if strip.generation == self.generation:
+                update(strip)
+                strip.generation += 1
+
+    def is_loaded(self) -> bool:
+        return self._history is not None
+
     @classmethod
     def create(cls, name: str, interval: str) -> "BaseHabit":
         match interval:
@@ -68,6 +247,9 @@ class BaseHabit(ABC):
         Returns:
             None
         """
+        if value is self:
+            return True
+
         if not isinstance(value, BaseHabit):
             return False
 
@@ -96,7 +278,7 @@ class BaseHabit(ABC):
                 print("Current streaks don't match")
             return False
 
-        if self.start.date() != value.start.date():
+        if self.start_day != value.start_day:
             if DEBUG:
                 print("Start dates don't match")
             return False
@@ -108,9 +290,32 @@ class BaseHabit(ABC):
 
         return True
 
-    @abstractmethod
-    def reset(self):
-        pass
+    @property
+    def start(self) -> datetime:
+        return from_epoch_day(self.start_day)
+
+    @start.setter
+    def start(self, start: datetime) -> None:
+        self.start_day = to_epoch_day(start)
+
+    def reset(self, today: Optional[datetime] = None):
+        self.reset_day(to_epoch_day(today) if today else CLOCK.day())
+
+    def reset_day(self, day: int) -> None:
+        """
+        This method starts the interval containing a day
+
+        Args:
+            self (Habit)
+            day (int): The epoch day
+
+        Returns:
+            None
+        """
+        self.start_day = period_start(self.interval, period_index(self.interval, day))
+        self.completed = 0
+        self.dirty = True
+        self.push_interval(0)
 
     def inspect_self(self, prefix: str = "  ") -> None:
         """
@@ -123,8 +328,8 @@ class BaseHabit(ABC):
             None
         """
         # get the history in an understandable way
-        history_len = len(self.history)
-        ones = sum(self.history)
+        history_len = self.periods
+        ones = self.completions
         zeros = history_len - ones
 
         # show the last 10 results nicely formatted
@@ -137,43 +342,105 @@ class BaseHabit(ABC):
         print(f"{prefix}Current Streak: {self.current_streak}")
         print(f"{prefix}Longest Negative Streak: {self.longest_negative}")
         print(f"{prefix}Current Negative Streak: {self.current_negative}")
-        comp_rate = ones / history_len * 100
-        print(f"{prefix}Completion Rate: {percentage_gradient(comp_rate)}")
+        print(f"{prefix}Completion Rate: {percentage_gradient(self.completion_rate() * 100)}")
+        rates = " / ".join(percentage_gradient(self.window_rate(size) * 100) for size in RATE_WINDOWS)
+        print(f"{prefix}Last {'/'.join(map(str, RATE_WINDOWS))} Intervals: {rates}")
+        print(f"{prefix}Best {BEST_WINDOW} Intervals: {percentage_gradient(self.best_rate(BEST_WINDOW) * 100)}")
+
+    def completion_rate(self) -> float:
+        return self.cached("completion_rate", lambda: self.completions / self.periods if self.periods else 0.0)
+
+    def window_rate(self, size: int) -> float:
+        """
+        This method returns the completion rate of the last `size` intervals in constant time
+
+        Args:
+            self (Habit)
+            size (int): The number of intervals
+
+        Returns:
+            rate (float): The completion rate between 0 and 1
+        """
+        periods = min(size, self.periods)
+        return self.cached(("window_rate", size), lambda: self.history.window(size) / periods if periods else 0.0)
 
-    def insert_missed(self, missed: int):
+    def best_rate(self, size: int) -> float:
         """
-        This method either updates the current streak or inserts
+        This method returns the best completion rate of any `size` consecutive intervals
+
+        Args:
+            self (Habit)
+            size (int): The number of intervals
+
+        Returns:
+            rate (float): The completion rate between 0 and 1
+        """
+        periods = min(size, self.periods)
+        return self.cached(("best_rate", size), lambda: self.history.best_window(size) / periods if periods else 0.0)
+
+    def insert_missed(self, missed: int, today: Optional[datetime] = None):
+        """
+        This method inserts the missed intervals into the history and starts a new interval
 
         Args:
             self (Habit)
             missed (int): The number of missed intervals. i.e. With "weekly" n missed are n weeks
+            today (Optional[datetime]): The date the new interval starts at. Defaults to CLOCK.today()
 
         Returns:
             None
         """
-        self.current_streak += self.completed
-        self.current_negative -= self.completed - 1
-
-        if self.current_streak > self.longest_streak:
-            self.longest_streak = self.current_streak
+        self.insert_missed_day(missed, to_epoch_day(today) if today else CLOCK.day())
 
-        # update
-        self.current_negative += max(missed, 0)
-        if self.current_negative > self.longest_negative:
-            self.longest_negative = self.current_negative
+    def insert_missed_day(self, missed: int, day: int) -> None:
+        # all missed intervals are appended at once, the streaks follow in closed form
+        self.dirty = True
+        self.push_interval(0, missed - 1)
+        self.reset_day(day)
 
-        if not self.completed or missed > 1:
-            self.current_streak = 0
-        else:
-            self.current_negative = 0
+    def push_interval(self, value: int, count: int = 1) -> None:
+        """
+        This method appends `count` intervals with the same value to the history and
+        updates the streaks in constant time
 
-        for _ in range(missed - 1):
-            self.history.append(0)
+        Args:
+            self (Habit)
+            value (int): 1 if the interval was completed, 0 otherwise
+            count (int): The number of intervals to append. Defaults to 1
 
-        self.reset()
+        Returns:
+            None
+        """
+        if count <= 0:
+            return
 
-    @abstractmethod
-    def check_interval(self) -> tuple[int, int]:
+        if self._history is None and not value:
+            # no need to load the history just to append zeros
+            self.pending_zeros += count
+        else:
+            self.history.extend(value, count)
+        self.periods += count
+        self.completions += value * count
+
+        if value:
+            if not self.current_streak:
+                self.closed_negative = max(self.closed_negative, self.current_negative)
+                self.previous_run = self.current_negative
+                self.current_negative = 0
+            self.current_streak += count
+        else:
+            if not self.current_negative:
+                self.closed_streak = max(self.closed_streak, self.current_streak)
+                self.previous_run = self.current_streak
+                self.current_streak = 0
+            self.current_negative += count
+
+        self.longest_streak = max(self.closed_streak, self.current_streak)
+        self.longest_negative = max(self.closed_negative, self.current_negative)
+        self.update_strips(lambda strip: strip.push(value, count))
+        self.invalidate()
+
+    def check_interval(self, today: Optional[datetime] = None) -> tuple[int, int]:
         """
         This function checks first checks if the current date is out of bounds of the desired interval.
         For example: For daily habits, it checks whether the date has changed. For monthly habits, it checks whether the month or year have changed.
@@ -181,16 +448,37 @@ class BaseHabit(ABC):
 
         Args:
             self (Habit)
+            today (Optional[datetime]): The date to check against. Defaults to CLOCK.today()
 
         Returns:
             (current streak, current negative)((int, int)): Returns the current negative and positive streaks
 
         """
-        pass
+        return self.check_day(to_epoch_day(today) if today else CLOCK.day())
+
+    def check_day(self, day: int) -> tuple[int, int]:
+        """
+        This method is check_interval on an epoch day. The missed intervals are the difference
+        of the period indexes, so rolling over costs the same for every interval and gap.
+        Stores convert the current date once and call this for every habit.
+
+        Args:
+            self (Habit)
+            day (int): The epoch day to check against
+
+        Returns:
+            (current streak, current negative)((int, int)): Returns the current negative and positive streaks
+        """
+        current = period_index(self.interval, day)
+        started = period_index(self.interval, self.start_day)
+        if current != started:
+            self.insert_missed_day(current - started, day)
+        return (self.current_streak, self.current_negative)
 
     def toggle_completed(self) -> None:
         """
-        This method toggles the completion of this habit. It also handles updating the history and calls the update function for the streaks.
+        This method toggles the completion of this habit. It also handles updating the history and the streaks.
+        Since only the last interval changes, the streaks are updated in constant time.
 
         Args:
             self (Habit)
@@ -199,12 +487,39 @@ class BaseHabit(ABC):
             None
         """
         self.completed = 0 if self.completed else 1
-        self.history[-1] = self.completed
-        self.calculate_streaks()
+        self.history.set_last(self.completed)
+        self.completions += 1 if self.completed else -1
+        self.dirty = True
+
+        if self.completed:
+            # the last interval moves from the negative run to a positive one
+            if self.current_negative == 1:
+                self.current_streak = self.previous_run + 1
+                self.previous_run = 0
+            else:
+                self.closed_negative = max(self.closed_negative, self.current_negative - 1)
+                self.previous_run = self.current_negative - 1
+                self.current_streak = 1
+            self.current_negative = 0
+        else:
+            if self.current_streak == 1:
+                self.current_negative = self.previous_run + 1
+                self.previous_run = 0
+            else:
+                self.closed_streak = max(self.closed_streak, self.current_streak - 1)
+                self.previous_run = self.current_streak - 1
+                self.current_negative = 1
+            self.current_streak = 0
+
+        self.longest_streak = max(self.closed_streak, self.current_streak)
+        self.longest_negative = max(self.closed_negative, self.current_negative)
+        self.update_strips(lambda strip: strip.set_last(self.completed))
+        self.invalidate()
 
     def calculate_streaks(self) -> None:
         """
         This method calculates and updates the (1) current positive, (2) current negative, (3) longest positive, and (4) longest negative streak.
+        It scans the whole history and also rebuilds the run state used for incremental updates.
 
         Args:
             self (Habit)
@@ -214,17 +529,30 @@ class BaseHabit(ABC):
         """
         longest_positive = longest_negative = 0
         current_positive = current_negative = 0
+        previous_run = 0
 
         for value in self.history:
             if value:
+                if current_negative:
+                    previous_run = current_negative
                 current_positive += 1
                 longest_negative = max(longest_negative, current_negative)
                 current_negative = 0
             else:
+                if current_positive:
+                    previous_run = current_positive
                 current_negative += 1
                 longest_positive = max(longest_positive, current_positive)
                 current_positive = 0
 
+        self.periods = len(self.history)
+        self.completions = self.history.count()
+
+        # the current run is not closed yet
+        self.closed_streak = longest_positive
+        self.closed_negative = longest_negative
+        self.previous_run = previous_run
+
         # Final check in case the list ends with a streak
         longest_positive = max(longest_positive, current_positive)
         longest_negative = max(longest_negative, current_negative)
@@ -233,6 +561,7 @@ class BaseHabit(ABC):
         self.current_negative = current_negative
         self.longest_streak = longest_positive
         self.longest_negative = longest_negative
+        self.invalidate()
 
     def ui_history(self, prefix: str = "", max_rows: int = 3) -> str:
         """
@@ -246,15 +575,19 @@ class BaseHabit(ABC):
         Returns:
             string (str): The formated string
         """
-        num_intervals = self.num_intervals or 7
+        key = (prefix, max_rows)
+        if self.strips is None:
+            self.strips = {}
+        strip = self.strips.get(key)
+        if strip and strip.generation == self.generation:
+            CACHE_STATS.hits += 1
+        else:
+            CACHE_STATS.misses += 1
+            strip = self.strips[key] = self.history_strip(prefix, max_rows)
+        return strip.render()
 
-        colored = [green("■") if i == 1 else red("■") for i in self.history[::-1]]
-        upper_bound = min(max_rows * num_intervals, len(self.history))
-        lines = [
-            "".join(colored[i : i + num_intervals])
-            for i in range(0, upper_bound, num_intervals)
-        ]
-        return f"\n{prefix}".join(lines)
+    def history_strip(self, prefix: str, max_rows: int) -> HistoryStrip:
+        return HistoryStrip(self.history, prefix, max_rows, self.num_intervals or 7, self.generation)
 
     def to_dict(self) -> dict[str, Any]:
         """
@@ -271,23 +604,37 @@ class BaseHabit(ABC):
         data["name"] = self.name
         data["interval"] = self.interval
         data["completed"] = self.completed
-        data["start"] = datetime.strftime(self.start, DATEFORMAT)
+        data["start"] = self.start_day
 
         data["longest_streak"] = self.longest_streak
         data["current_streak"] = self.current_streak
         data["longest_negative"] = self.longest_negative
         data["current_negative"] = self.current_negative
-        data["history"] = self.history
+        if self._history is None and self.history_payload is not None:
+            # unloaded histories are written back without decoding them
+            persisted = self.periods - self.pending_zeros
+            data["history"] = History.extend_base64(self.history_payload, persisted, self.pending_zeros)
+        else:
+            data["history"] = self.history.to_base64()
+        data["history_len"] = self.periods
+        data["completions"] = self.completions
+        data["run_state"] = [self.closed_streak, self.closed_negative, self.previous_run]
         return data
 
     @classmethod
-    def from_dict(cls, data: dict[str, Any]) -> "BaseHabit":
+    def from_dict(
+        cls, data: dict[str, Any], check: bool = True, lazy: bool = False, calculate: bool = True
+    ) -> "BaseHabit":
         """
         This method deserializes a Habit instance from a HashMap
 
         Args:
             cls (Habit)
             data (dict): HashMaps containing the needed data for deserialization
+            check (bool): Whether the habit should be rolled over to the current interval
+            lazy (bool): Whether decoding the history should be deferred until it is accessed
+            calculate (bool): Whether streaks missing from old save files are calculated right away.
+                Pass False to calculate them for many habits at once, see streaks.recalculate_streaks
 
         Returns:
             habit (Habit): A Habit instance deserialized from the dict
@@ -295,69 +642,48 @@ class BaseHabit(ABC):
         habit = BaseHabit.create(data["name"], data["interval"])
         habit.uid = data["uid"]
         habit.completed = data["completed"]
-        habit.start = datetime.strptime(data["start"], DATEFORMAT)
+        # older save files contain DATEFORMAT strings
+        habit.start_day = parse_day(data["start"])
 
         habit.longest_streak = data["longest_streak"]
         habit.current_streak = data["current_streak"]
         habit.longest_negative = data["longest_negative"]
         habit.current_negative = data["current_negative"]
-        habit.history = data["history"]
+        if isinstance(data["history"], list):
+            # legacy save files store the history as a list of ints
+            habit.history = History(data["history"])
+        elif lazy and "completions" in data and "run_state" in data:
+            loader = partial(History.from_base64, data["history"], data["history_len"])
+            habit.set_history_loader(loader, data["history_len"], data["completions"], data["history"])
+        else:
+            habit.history = History.from_base64(data["history"], data["history_len"])
+
+        if "run_state" in data:
+            habit.closed_streak, habit.closed_negative, habit.previous_run = data["run_state"]
+        elif calculate:
+            habit.calculate_streaks()
 
         # update with current data
-        habit.check_interval()
+        if check:
+            habit.check_interval()
         return habit
 
 
 # SUBCLASSES
+# The intervals only differ in their period arithmetic, see classes.periods
 class DailyHabit(BaseHabit):
     def __init__(self, name: str) -> None:
         self.num_intervals = 7
         super().__init__(name, "daily")
 
-    def reset(self):
-        self.start = TODAY
-        self.completed = 0
-        self.history.append(0)
-
-    def check_interval(self) -> tuple[int, int]:
-        if self.start.date() != TODAY.date():
-            missed = (TODAY - self.start).days
-            self.insert_missed(missed)
-        return (self.current_streak, self.current_negative)
-
 
 class WeeklyHabit(BaseHabit):
     def __init__(self, name: str) -> None:
         self.num_intervals = 4
         super().__init__(name, "weekly")
 
-    def check_interval(self) -> tuple[int, int]:
-        this_week = TODAY - timedelta(days=TODAY.weekday())
-        if self.start.date() != this_week.date():
-            missed = (this_week - self.start).days // 7
-            self.insert_missed(missed)
-        return (self.current_streak, self.current_negative)
-
-    def reset(self):
-        self.start = TODAY - timedelta(days=TODAY.weekday())
-        self.completed = 0
-        self.history.append(0)
-
 
 class MonthlyHabit(BaseHabit):
     def __init__(self, name: str) -> None:
         self.num_intervals = 5
         super().__init__(name, "monthly")
-
-    def reset(self):
-        self.start = TODAY.replace(day=1)
-        self.completed = 0
-        self.history.append(0)
-
-    def check_interval(self) -> tuple[int, int]:
-        if (self.start.month, self.start.year) != (TODAY.month, TODAY.year):
-            missed = (
-                (TODAY.year - self.start.year) * 12 + TODAY.month - self.start.month
-            )
-            self.insert_missed(missed)
-        return (self.current_streak, self.current_negative)
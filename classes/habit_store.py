@@ -0,0 +1,416 @@
+from array import array
+from collections.abc import Iterator, Mapping, MutableMapping
+from typing import Any, Callable, Optional
+import uuid
+
+from classes.binary_store import INTERVALS
+from classes.habit import BaseHabit
+from classes.history import History, fill_bits
+from classes.history_strip import HistoryStrip
+
+# column name and array typecode, one array per column
+COLUMNS = (
+    ("interval", "B"),
+    ("completed", "B"),
+    ("dirty", "B"),
+    ("start", "i"),  # epoch day
+    ("periods", "I"),
+    ("completions", "I"),
+    ("current_streak", "I"),
+    ("longest_streak", "I"),
+    ("current_negative", "I"),
+    ("longest_negative", "I"),
+    ("closed_streak", "I"),
+    ("closed_negative", "I"),
+    ("previous_run", "I"),
+    ("length", "I"),  # history length in bits
+    ("history_offset", "I"),  # in bytes, into the arena
+    ("history_capacity", "I"),  # in bytes
+    ("name_offset", "I"),
+    ("name_len", "I"),
+    ("generation", "Q"),  # see BaseHabit.generation
+)
+COUNTERS = tuple(name for name, _ in COLUMNS[4:13])
+
+# arenas are only compacted once they contain at least this many unused bytes
+MIN_GARBAGE = 1 << 16
+
+
+class HabitStore(MutableMapping):
+    """
+    A columnar container for large numbers of habits, usable in place of the habit
+    dict of Filter.base. Every attribute lives in a parallel array, the names and
+    histories are packed into one bytearray each. Habits are only materialized as
+    HabitView objects on access, which expose the BaseHabit API on top of the columns.
+    Uids have to be uuids, they are stored as 16 bytes.
+    """
+    columns: dict[str, array]
+    uids: bytearray
+    names: bytearray
+    arena: bytearray
+    index: dict[bytes, int]  # uid bytes to row
+    free: list[int]  # rows of removed habits
+    garbage: int  # unused bytes in the arenas
+    observer: Optional[Callable[[BaseHabit, str, Any], None]]  # shared by all views, see BaseHabit.observer
+
+    def __init__(self, habits: Optional[Mapping[str, BaseHabit]] = None) -> None:
+        self.columns = {name: array(code) for name, code in COLUMNS}
+        self.uids = bytearray()
+        self.names = bytearray()
+        self.arena = bytearray()
+        self.index = {}
+        self.free = []
+        self.garbage = 0
+        self.observer = None
+        self.update(habits or {})
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __iter__(self) -> Iterator[str]:
+        for key in self.index:
+            yield str(uuid.UUID(bytes=key))
+
+    def __contains__(self, uid: object) -> bool:
+        return self._key(uid) in self.index
+
+    def __getitem__(self, uid: str) -> "HabitView":
+        row = self.index.get(self._key(uid))
+        if row is None:
+            raise KeyError(uid)
+        return HabitView(self, row)
+
+    def __setitem__(self, uid: str, habit: BaseHabit) -> None:
+        key = self._key(uid)
+        if key is None:
+            raise ValueError(f"uid {uid} is not a uuid")
+        row = self.index.get(key)
+        if row is None:
+            row = self._new_row(key)
+        self._write(row, habit)
+
+    def __delitem__(self, uid: str) -> None:
+        row = self.index.pop(self._key(uid), None)
+        if row is None:
+            raise KeyError(uid)
+        columns = self.columns
+        self.garbage += columns["history_capacity"][row] + columns["name_len"][row]
+        columns["history_capacity"][row] = 0
+        columns["name_len"][row] = 0
+        self.free.append(row)
+
+    # views are created while iterating, so only one of them is alive at a time
+    def values(self) -> Iterator["HabitView"]:  # type: ignore[override]
+        for row in self.index.values():
+            yield HabitView(self, row)
+
+    def items(self) -> Iterator[tuple[str, "HabitView"]]:  # type: ignore[override]
+        for key, row in self.index.items():
+            yield str(uuid.UUID(bytes=key)), HabitView(self, row)
+
+    @staticmethod
+    def _key(uid: object) -> Optional[bytes]:
+        try:
+            return uuid.UUID(str(uid)).bytes
+        except ValueError:
+            return None
+
+    def _new_row(self, key: bytes) -> int:
+        if self.free:
+            row = self.free.pop()
+            self.uids[row * 16:row * 16 + 16] = key
+            for column in self.columns.values():
+                column[row] = 0
+        else:
+            row = len(self.uids) // 16
+            self.uids += key
+            for column in self.columns.values():
+                column.append(0)
+        self.index[key] = row
+        return row
+
+    def _write(self, row: int, habit: BaseHabit) -> None:
+        columns = self.columns
+        columns["interval"][row] = INTERVALS.index(habit.interval)
+        columns["completed"][row] = habit.completed
+        columns["dirty"][row] = habit.dirty
+        columns["start"][row] = habit.start_day
+        for name in COUNTERS:
+            columns[name][row] = getattr(habit, name)
+        self.set_name(row, habit.name)
+        self.set_history(row, habit.history)
+
+    def compact(self) -> None:
+        """
+        This method drops the unused space left behind by removed habits, renames and grown histories
+
+        Args:
+            self (HabitStore)
+
+        Returns:
+            None
+        """
+        columns = self.columns
+        arena = bytearray()
+        names = bytearray()
+        for row in self.index.values():
+            offset = columns["history_offset"][row]
+            columns["history_offset"][row] = len(arena)
+            arena += self.arena[offset:offset + columns["history_capacity"][row]]
+            offset = columns["name_offset"][row]
+            columns["name_offset"][row] = len(names)
+            names += self.names[offset:offset + columns["name_len"][row]]
+        self.arena = arena
+        self.names = names
+        self.garbage = 0
+
+    # accessors used by HabitView and RowHistory
+    def get_uid(self, row: int) -> str:
+        return str(uuid.UUID(bytes=bytes(self.uids[row * 16:row * 16 + 16])))
+
+    def get_name(self, row: int) -> str:
+        offset = self.columns["name_offset"][row]
+        return self.names[offset:offset + self.columns["name_len"][row]].decode("utf-8")
+
+    def set_name(self, row: int, name: str) -> None:
+        # the old name is left behind until the next compaction
+        data = name.encode("utf-8")
+        self.garbage += self.columns["name_len"][row]
+        self.columns["name_offset"][row] = len(self.names)
+        self.columns["name_len"][row] = len(data)
+        self.names += data
+
+    def _reserve(self, row: int, size: int) -> None:
+        # moves the history to the end of the arena if it outgrew its capacity
+        columns = self.columns
+        capacity = columns["history_capacity"][row]
+        if size <= capacity:
+            return
+        if self.garbage > max(len(self.arena) // 2, MIN_GARBAGE):
+            self.compact()
+
+        offset = columns["history_offset"][row]
+        used = (columns["length"][row] + 7) // 8
+        new_capacity = max(size, capacity * 2, 8)
+        columns["history_offset"][row] = len(self.arena)
+        columns["history_capacity"][row] = new_capacity
+        self.arena += self.arena[offset:offset + used]
+        self.arena += bytes(new_capacity - used)
+        self.garbage += capacity
+
+    def history_bits(self, row: int) -> memoryview:
+        # the arena can't be resized while the view is alive, so it must not be kept across mutations
+        offset = self.columns["history_offset"][row]
+        return memoryview(self.arena)[offset:offset + (self.columns["length"][row] + 7) // 8]
+
+    def get_bit(self, row: int, index: int) -> int:
+        return (self.arena[self.columns["history_offset"][row] + (index >> 3)] >> (index & 7)) & 1
+
+    def set_bit(self, row: int, index: int, value: int) -> None:
+        byte = self.columns["history_offset"][row] + (index >> 3)
+        if value:
+            self.arena[byte] |= 1 << (index & 7)
+        else:
+            self.arena[byte] &= ~(1 << (index & 7))
+
+    def extend_history(self, row: int, value: int, count: int) -> None:
+        if count <= 0:
+            return
+        start = self.columns["length"][row]
+        end = start + count
+        self._reserve(row, (end + 7) // 8)
+        self.columns["length"][row] = end
+        if value:
+            offset = self.columns["history_offset"][row] * 8
+            fill_bits(self.arena, offset + start, offset + end)
+
+    def set_history(self, row: int, history: History) -> None:
+        size = (len(history) + 7) // 8
+        self._reserve(row, size)
+        offset = self.columns["history_offset"][row]
+        capacity = self.columns["history_capacity"][row]
+        self.arena[offset:offset + capacity] = bytes(history.bits) + bytes(capacity - size)
+        self.columns["length"][row] = len(history)
+
+
+class RowHistory(History):
+    """
+    The history of a single HabitStore row. Reads and writes go straight to the arena.
+    Window indexes only live as long as the RowHistory and are dropped on mutation.
+    """
+    __slots__ = ("store", "row")
+    store: HabitStore
+    row: int
+
+    def __init__(self, store: HabitStore, row: int) -> None:
+        self.store = store
+        self.row = row
+        self.prefix = None
+        self.best = None
+
+    @property
+    def bits(self) -> memoryview:  # type: ignore[override]
+        return self.store.history_bits(self.row)
+
+    @property
+    def length(self) -> int:  # type: ignore[override]
+        return self.store.columns["length"][self.row]
+
+    def _get(self, index: int) -> int:
+        return self.store.get_bit(self.row, index)
+
+    def _own(self) -> None:
+        pass
+
+    def __setitem__(self, index: int, value: int) -> None:
+        self.store.set_bit(self.row, self._normalize(index), value)
+        self.prefix = self.best = None
+
+    def append(self, value: int) -> None:
+        self.extend(value, 1)
+
+    def extend(self, value: int, count: int) -> None:
+        self.store.extend_history(self.row, value, count)
+        self.prefix = self.best = None
+
+
+def column(name: str, observed: bool = False) -> property:
+    def get(self: "HabitView") -> int:
+        return self.store.columns[name][self.row]
+
+    def set(self: "HabitView", value: int) -> None:
+        values = self.store.columns[name]
+        old = values[self.row]
+        values[self.row] = value
+        # same as classes.habit.observed
+        if observed and self.store.observer and old != value:
+            self.store.observer(self, name, old)
+
+    return property(get, set)
+
+
+class HabitView:
+    """
+    A habit stored in a HabitStore. Views only reference their row, all attributes
+    are read from and written to the columns, so the BaseHabit methods work on them as is.
+    Views of removed habits must not be used anymore.
+    """
+    __slots__ = ("store", "row")
+    store: HabitStore
+    row: int
+
+    def __init__(self, store: HabitStore, row: int) -> None:
+        self.store = store
+        self.row = row
+
+    completed = column("completed", observed=True)
+    periods = column("periods")
+    completions = column("completions")
+    current_streak = column("current_streak")
+    longest_streak = column("longest_streak")
+    current_negative = column("current_negative")
+    longest_negative = column("longest_negative")
+    closed_streak = column("closed_streak")
+    closed_negative = column("closed_negative")
+    previous_run = column("previous_run")
+    generation = column("generation")
+
+    @property
+    def uid(self) -> str:
+        return self.store.get_uid(self.row)
+
+    @property
+    def observer(self) -> Optional[Callable[[BaseHabit, str, Any], None]]:
+        return self.store.observer
+
+    @observer.setter
+    def observer(self, observer: Optional[Callable[[BaseHabit, str, Any], None]]) -> None:
+        self.store.observer = observer
+
+    @property
+    def name(self) -> str:
+        return self.store.get_name(self.row)
+
+    @name.setter
+    def name(self, name: str) -> None:
+        self.store.set_name(self.row, name)
+
+    @property
+    def interval(self) -> str:
+        return INTERVALS[self.store.columns["interval"][self.row]]
+
+    @property
+    def num_intervals(self) -> int:
+        return {"daily": 7, "weekly": 4, "monthly": 5}[self.interval]
+
+    start_day = column("start")
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self.store.columns["dirty"][self.row])
+
+    @dirty.setter
+    def dirty(self, dirty: bool) -> None:
+        self.store.columns["dirty"][self.row] = dirty
+
+    @property
+    def history(self) -> History:
+        return RowHistory(self.store, self.row)
+
+    @history.setter
+    def history(self, history: History) -> None:
+        self.store.set_history(self.row, history)
+        self.periods = len(history)
+        self.completions = history.count()
+
+    # the history is always loaded, see BaseHabit.push_interval
+    _history = history
+
+    def is_loaded(self) -> bool:
+        return True
+
+    # views are created on every access, so there is nothing to cache derived values on,
+    # the generation is still kept per row for the observers and the rendered strips
+    def invalidate(self) -> None:
+        generations = self.store.columns["generation"]
+        generations[self.row] += 1
+        if self.store.observer:
+            self.store.observer(self, "generation", generations[self.row] - 1)
+
+    def cached(self, key: Any, compute: Callable[[], Any]) -> Any:
+        return compute()
+
+    def update_strips(self, update: Callable[[HistoryStrip], None]) -> None:
+        pass
+
+    def ui_history(self, prefix: str = "", max_rows: int = 3) -> str:
+        return self.history_strip(prefix, max_rows).render()
+
+    def to_habit(self) -> BaseHabit:
+        return BaseHabit.from_dict(self.to_dict(), check=False)
+
+    # borrowed from BaseHabit, they only use the attributes above
+    __str__ = BaseHabit.__str__
+    __eq__ = BaseHabit.__eq__
+    inspect_self = BaseHabit.inspect_self
+    window_rate = BaseHabit.window_rate
+    best_rate = BaseHabit.best_rate
+    start = BaseHabit.start
+    reset = BaseHabit.reset
+    reset_day = BaseHabit.reset_day
+    check_interval = BaseHabit.check_interval
+    check_day = BaseHabit.check_day
+    insert_missed = BaseHabit.insert_missed
+    insert_missed_day = BaseHabit.insert_missed_day
+    push_interval = BaseHabit.push_interval
+    toggle_completed = BaseHabit.toggle_completed
+    calculate_streaks = BaseHabit.calculate_streaks
+    history_strip = BaseHabit.history_strip
+    completion_rate = BaseHabit.completion_rate
+    to_dict = BaseHabit.to_dict
+
+    def __repr__(self) -> str:
+        return f"HabitView({self.uid!r}, {self.name!r})"
+
+
+BaseHabit.register(HabitView)
@@ -0,0 +1,305 @@
+from array import array
+from typing import Iterable, Iterator, Optional, Union
+import base64
+
+# number of set bits of every byte value
+POPCOUNT = bytes(bin(i).count("1") for i in range(256))
+
+
+def fill_bits(bits: bytearray, start: int, end: int) -> None:
+    """
+    This function sets the bits start to end (exclusive) of `bits`
+
+    Args:
+        bits (bytearray): The packed bits, bit 0 being the lowest bit of the first byte
+        start (int): The first bit to be set
+        end (int): The bit after the last bit to be set
+
+    Returns:
+        None
+    """
+    # fill the partial first byte, then whole bytes, then the partial last byte
+    first_full = min((start + 7) & ~7, end)
+    for i in range(start, first_full):
+        bits[i >> 3] |= 1 << (i & 7)
+    last_full = max(end & ~7, first_full)
+    bits[first_full >> 3:last_full >> 3] = b"\xff" * ((last_full - first_full) >> 3)
+    for i in range(last_full, end):
+        bits[i >> 3] |= 1 << (i & 7)
+
+
+class History:
+    """
+    A compact completion history. Every interval is stored as a single bit in a
+    bytearray, the oldest interval being bit 0 of the first byte.
+    The bits may also be a read-only memoryview (e.g. into a mapped save file),
+    which is copied on the first mutation.
+    Window queries build a prefix sum over the bytes, which is kept up to date
+    by every mutation afterwards.
+    """
+    __slots__ = ("bits", "length", "prefix", "best")
+    bits: Union[bytearray, memoryview]
+    length: int
+    prefix: Optional[array]  # prefix[i]: number of set bits in bits[:i]
+    best: Optional[dict[int, int]]  # cached best_window results by window size
+
+    def __init__(self, values: Iterable[int] = ()) -> None:
+        self.bits = bytearray()
+        self.length = 0
+        self.prefix = None
+        self.best = None
+        for value in values:
+            self.append(value)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __iter__(self) -> Iterator[int]:
+        bits = self.bits
+        for i in range(self.length):
+            yield (bits[i >> 3] >> (i & 7)) & 1
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[int, list[int]]:
+        if isinstance(index, slice):
+            return [self._get(i) for i in range(*index.indices(self.length))]
+        return self._get(self._normalize(index))
+
+    def __setitem__(self, index: int, value: int) -> None:
+        index = self._normalize(index)
+        self._own()
+        mask = 1 << (index & 7)
+        if value:
+            self.bits[index >> 3] |= mask
+        else:
+            self.bits[index >> 3] &= ~mask
+        self._update_prefix(index >> 3)
+
+        if not self.best:
+            return
+        if index != self.length - 1:
+            self.best = None
+            return
+        # only the windows ending with the last interval contain it
+        for size, best in list(self.best.items()):
+            if value:
+                self.best[size] = max(best, self.window(size))
+            elif self.window(size) + 1 >= best:
+                # the best window might have lost its completion
+                del self.best[size]
+
+    def __eq__(self, value: object) -> bool:
+        if isinstance(value, History):
+            return self.length == value.length and self.bits == value.bits
+        if isinstance(value, (list, tuple)):
+            return list(self) == list(value)
+        return False
+
+    def __repr__(self) -> str:
+        return f"History({list(self)})"
+
+    def _normalize(self, index: int) -> int:
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("history index out of range")
+        return index
+
+    def _get(self, index: int) -> int:
+        return (self.bits[index >> 3] >> (index & 7)) & 1
+
+    def _own(self) -> None:
+        # copy on write for histories backed by a view
+        if not isinstance(self.bits, bytearray):
+            self.bits = bytearray(self.bits)
+
+    def append(self, value: int) -> None:
+        """
+        This method appends a new interval to the history
+
+        Args:
+            self (History)
+            value (int): 1 if the interval was completed, 0 otherwise
+
+        Returns:
+            None
+        """
+        self.extend(value, 1)
+
+    def extend(self, value: int, count: int) -> None:
+        """
+        This method appends `count` intervals with the same value at once
+
+        Args:
+            self (History)
+            value (int): 1 if the intervals were completed, 0 otherwise
+            count (int): The number of intervals to append
+
+        Returns:
+            None
+        """
+        if count <= 0:
+            return
+
+        self._own()
+        start = self.length
+        end = start + count
+        self.bits.extend(bytes((end + 7) // 8 - len(self.bits)))
+        self.length = end
+        if value:
+            fill_bits(self.bits, start, end)
+        self._update_prefix(start >> 3)
+
+        # appended zeros never improve a window, appended ones improve the last one the most
+        if value and self.best:
+            for size, best in self.best.items():
+                self.best[size] = max(best, self.window(size))
+
+    def set_last(self, value: int) -> None:
+        self[-1] = value
+
+    def last(self, n: int) -> list[int]:
+        """
+        This method returns the values of the last n intervals, oldest first
+
+        Args:
+            self (History)
+            n (int): The number of intervals
+
+        Returns:
+            values (list[int]): The last n values
+        """
+        return [self._get(i) for i in range(max(self.length - n, 0), self.length)]
+
+    def _update_prefix(self, byte: int) -> None:
+        # recalculates the prefix sums from `byte` on, if they were built already
+        prefix = self.prefix
+        if prefix is None:
+            return
+        del prefix[byte + 1:]
+        total = prefix[byte]
+        for value in self.bits[byte:]:
+            total += POPCOUNT[value]
+            prefix.append(total)
+
+    def count_until(self, end: int) -> int:
+        """
+        This method returns the number of completed intervals before `end` in constant time
+
+        Args:
+            self (History)
+            end (int): The index of the first interval not counted
+
+        Returns:
+            count (int): Number of set bits in [0, end)
+        """
+        if self.prefix is None:
+            self.prefix = array("I", [0])
+            self._update_prefix(0)
+        byte = end >> 3
+        if end & 7:
+            return self.prefix[byte] + POPCOUNT[self.bits[byte] & ((1 << (end & 7)) - 1)]
+        return self.prefix[byte]
+
+    def count_range(self, start: int, end: int) -> int:
+        return self.count_until(end) - self.count_until(start)
+
+    def window(self, size: int) -> int:
+        """
+        This method returns the number of completed intervals among the last `size` intervals
+
+        Args:
+            self (History)
+            size (int): The window size
+
+        Returns:
+            count (int): Number of set bits in the window
+        """
+        return self.count_range(max(self.length - size, 0), self.length)
+
+    def best_window(self, size: int) -> int:
+        """
+        This method returns the highest number of completed intervals within any `size`
+        consecutive intervals. The result is cached and kept up to date on appends.
+
+        Args:
+            self (History)
+            size (int): The window size
+
+        Returns:
+            count (int): Number of set bits in the best window
+        """
+        if self.best is None:
+            self.best = {}
+        if size not in self.best:
+            self.best[size] = max(
+                (self.count_range(max(end - size, 0), end) for end in range(min(size, self.length), self.length + 1)),
+                default=0,
+            )
+        return self.best[size]
+
+    def count(self) -> int:
+        """
+        This method returns the number of completed intervals (popcount)
+
+        Args:
+            self (History)
+
+        Returns:
+            count (int): Number of set bits
+        """
+        return int.from_bytes(self.bits, "little").bit_count()
+
+    def is_view(self) -> bool:
+        return not isinstance(self.bits, bytearray)
+
+    @classmethod
+    def view(cls, buffer: memoryview, length: int) -> "History":
+        """
+        This method creates a history backed by `buffer` without copying it
+
+        Args:
+            cls (History)
+            buffer (memoryview): The packed bits, see History.bits
+            length (int): The number of intervals
+
+        Returns:
+            history (History): The history
+        """
+        if len(buffer) != (length + 7) // 8:
+            raise ValueError("history length does not match its data")
+        history = cls()
+        history.bits = buffer
+        history.length = length
+        return history
+
+    def to_base64(self) -> str:
+        return base64.b64encode(self.bits).decode("ascii")
+
+    @staticmethod
+    def extend_base64(data: str, length: int, count: int) -> str:
+        """
+        This function appends `count` uncompleted intervals to a history in base64,
+        without building the History
+
+        Args:
+            data (str): The history, see to_base64
+            length (int): The number of intervals in `data`
+            count (int): The number of intervals to append
+
+        Returns:
+            data (str): The extended history in base64
+        """
+        # the unused bits of the last byte are zero, so only whole zero bytes have to be added
+        missing = (length + count + 7) // 8 - (length + 7) // 8
+        if not missing:
+            return data
+        return base64.b64encode(base64.b64decode(data) + bytes(missing)).decode("ascii")
+
+    @classmethod
+    def from_base64(cls, data: str, length: int) -> "History":
+        history = cls()
+        history.bits = bytearray(base64.b64decode(data))
+        history.length = length
+        if len(history.bits) != (length + 7) // 8:
+            raise ValueError("history length does not match its data")
+        return history
@@ -0,0 +1,56 @@
+from collections import deque
+from typing import Optional
+
+from classes.history import History
+from helpers.text import HISTORY_GLYPHS
+
+
+class HistoryStrip:
+    """
+    The rendered history of a habit, as shown by BaseHabit.ui_history. The cells of the
+    newest intervals are kept newest first, so appending intervals or toggling the
+    newest one only shifts or replaces cells instead of rendering the whole strip again.
+    """
+    __slots__ = ("generation", "prefix", "row", "cells", "text")
+    generation: int  # the generation of the habit the strip is valid for
+    prefix: str
+    row: int  # number of cells per row
+    cells: deque[str]
+    text: Optional[str]  # the joined rows, None after the cells changed
+
+    def __init__(self, history: History, prefix: str, max_rows: int, row: int, generation: int) -> None:
+        size = max_rows * row
+        self.generation = generation
+        self.prefix = prefix
+        self.row = row
+        self.cells = deque((HISTORY_GLYPHS[value] for value in reversed(history.last(size))), maxlen=size)
+        self.text = None
+
+    def push(self, value: int, count: int = 1) -> None:
+        """
+        This method shifts in the cells of appended intervals
+
+        Args:
+            self (HistoryStrip)
+            value (int): 1 if the intervals were completed, 0 otherwise
+            count (int): The number of appended intervals. Defaults to 1
+
+        Returns:
+            None
+        """
+        glyph = HISTORY_GLYPHS[value]
+        for _ in range(min(count, self.cells.maxlen or 0)):
+            self.cells.appendleft(glyph)
+        self.text = None
+
+    def set_last(self, value: int) -> None:
+        if self.cells:
+            self.cells[0] = HISTORY_GLYPHS[value]
+            self.text = None
+
+    def render(self) -> str:
+        if self.text is None:
+            cells = list(self.cells)
+            rows = ("".join(cells[i : i + self.row]) for i in range(0, len(cells), self.row))
+            self.text = f"\n{self.prefix}".join(rows)
+        return self.text
@@ -0,0 +1,114 @@
+import json
+import os
+from typing import Any, Iterator, Optional, TextIO
+
+
+class Journal:
+    """
+    An append-only log of habit mutations. Every record is a single json line,
+    so the cost of an action does not depend on the size of the store.
+    Once `max_records` or `max_bytes` is exceeded the journal should be folded
+    into a new snapshot, which bounds the replay time on startup.
+    """
+    path: str
+    seq: int
+    records: int
+    size: int
+    max_records: int
+    max_bytes: int
+    file: Optional[TextIO]
+
+    def __init__(self, path: str, max_records: int = 1000, max_bytes: int = 1 << 20) -> None:
+        self.path = path
+        self.seq = 0
+        self.records = 0
+        self.size = 0
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.file = None
+
+    def append(self, record: dict[str, Any]) -> None:
+        """
+        This method appends a record to the journal and flushes it to disk
+
+        Args:
+            self (Journal)
+            record (dict): The mutation to be recorded, e.g. {"op": "remove", "uid": ...}
+
+        Returns:
+            None
+        """
+        self.seq += 1
+        record["seq"] = self.seq
+        if self.file is None:
+            self.file = open(self.path, "a")
+
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        self.file.write(line)
+        self.file.flush()
+        self.records += 1
+        self.size += len(line)
+
+    def needs_compaction(self) -> bool:
+        return self.records >= self.max_records or self.size >= self.max_bytes
+
+    def replay(self, after: int = 0) -> Iterator[dict[str, Any]]:
+        """
+        This method yields all records that were written after the sequence number `after`.
+        A torn trailing line (e.g. after a crash mid write) ends the replay and is cut off.
+
+        Args:
+            self (Journal)
+            after (int): The sequence number already contained in the snapshot
+
+        Returns:
+            records (Iterator[dict]): The records in the order they were written
+        """
+        self.seq = max(self.seq, after)
+        if not os.path.exists(self.path):
+            return
+
+        offset = 0
+        with open(self.path, "rb") as file:
+            for line in file:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("incomplete record")
+                    record = json.loads(line)
+                except ValueError:
+                    break
+
+                offset += len(line)
+                self.records += 1
+                seq = record.get("seq", 0)
+                self.seq = max(self.seq, seq)
+                if seq > after:
+                    yield record
+
+        # drop a torn tail so new records are not appended behind it
+        if offset != os.path.getsize(self.path):
+            os.truncate(self.path, offset)
+        self.size = offset
+
+    def truncate(self) -> None:
+        """
+        This method empties the journal. It must only be called once a snapshot
+        containing all records up to `self.seq` was written.
+
+        Args:
+            self (Journal)
+
+        Returns:
+            None
+        """
+        self.close()
+        # a journal that was never written stays absent, e.g. for the target of a conversion
+        if os.path.exists(self.path):
+            open(self.path, "w").close()
+        self.records = 0
+        self.size = 0
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
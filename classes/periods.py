@@ -0,0 +1,168 @@
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Optional
+
+from constants import DATEFORMAT
+
+# Dates are counted in days since 1970-01-01 (epoch days), periods are numbered per interval:
+# daily by the epoch day, weekly by the monday based week and monthly by year * 12 + month - 1.
+# All arithmetic is done on these ints, without creating datetime objects.
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+# 1970-01-01 was a thursday, weeks start on mondays
+WEEK_OFFSET = 3
+
+# widths of the DATEFORMAT fields the fast parser understands
+FIELD_WIDTHS = {"d": 2, "m": 2, "Y": 4}
+
+
+def date_fields(dateformat: str) -> Optional[tuple[str, tuple[str, ...]]]:
+    """
+    This function splits a date format like "%d-%m-%Y" into its separator and field order.
+    Dates in such formats are parsed without strptime.
+
+    Args:
+        dateformat (str): A strptime format
+
+    Returns:
+        (separator, fields)(Optional[(str, tuple[str, ...])]): e.g. ("-", ("d", "m", "Y")),
+            None if the format has other fields
+    """
+    if len(dateformat) < 3:
+        return None
+    separator = dateformat[2]
+    fields = tuple(field[1:] for field in dateformat.split(separator))
+    if sorted(fields) != sorted(FIELD_WIDTHS) or separator.join(f"%{field}" for field in fields) != dateformat:
+        return None
+    return separator, fields
+
+
+DATE_FIELDS = date_fields(DATEFORMAT)
+
+
+def to_epoch_day(day: date) -> int:
+    # works for datetimes too, the time of the day is ignored
+    return day.toordinal() - EPOCH_ORDINAL
+
+
+def from_epoch_day(day: int) -> datetime:
+    return datetime.fromordinal(day + EPOCH_ORDINAL)
+
+
+def days_from_civil(year: int, month: int, day: int) -> int:
+    """
+    This function converts a date into its epoch day
+
+    Args:
+        year (int)
+        month (int): 1 to 12
+        day (int): 1 to 31
+
+    Returns:
+        day (int): The days since 1970-01-01
+    """
+    # http://howardhinnant.github.io/date_algorithms.html, years start in march
+    year -= month <= 2
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month - 3 if month > 2 else month + 9) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+
+def civil_from_days(day: int) -> tuple[int, int, int]:
+    """
+    This function converts an epoch day into a date
+
+    Args:
+        day (int): The days since 1970-01-01
+
+    Returns:
+        (year, month, day)((int, int, int)): The date
+    """
+    day += 719468
+    era = day // 146097
+    day_of_era = day - era * 146097
+    year_of_era = (day_of_era - day_of_era // 1460 + day_of_era // 36524 - day_of_era // 146096) // 365
+    day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4 - year_of_era // 100)
+    shifted_month = (5 * day_of_year + 2) // 153
+    month = shifted_month + 3 if shifted_month < 10 else shifted_month - 9
+    return (year_of_era + era * 400 + (month <= 2), month, day_of_year - (153 * shifted_month + 2) // 5 + 1)
+
+
+@lru_cache(maxsize=4096)
+def month_index(day: int) -> int:
+    # only a few distinct days are checked at a time, so the civil conversion is cached
+    year, month, _ = civil_from_days(day)
+    return year * 12 + month - 1
+
+
+def period_index(interval: str, day: int) -> int:
+    """
+    This function returns the number of the period of an interval that contains a day.
+    The number of missed periods between two days is the difference of their indexes.
+
+    Args:
+        interval (str): "daily", "weekly" or "monthly"
+        day (int): An epoch day
+
+    Returns:
+        index (int): The period index
+    """
+    match interval:
+        case "monthly":
+            return month_index(day)
+        case "weekly":
+            return (day + WEEK_OFFSET) // 7
+        case _:
+            return day
+
+
+def period_start(interval: str, index: int) -> int:
+    """
+    This function returns the first day of a period
+
+    Args:
+        interval (str): "daily", "weekly" or "monthly"
+        index (int): The period index, see period_index
+
+    Returns:
+        day (int): The epoch day the period starts at
+    """
+    match interval:
+        case "monthly":
+            return days_from_civil(index // 12, index % 12 + 1, 1)
+        case "weekly":
+            return index * 7 - WEEK_OFFSET
+        case _:
+            return index
+
+
+def parse_day(value: int | str) -> int:
+    """
+    This function reads a persisted date. Dates are persisted as epoch days, older
+    save files contain DATEFORMAT strings, which stay readable.
+
+    Args:
+        value (int | str): The persisted date
+
+    Returns:
+        day (int): The epoch day
+    """
+    if isinstance(value, int):
+        return value
+    if DATE_FIELDS is None:
+        return to_epoch_day(datetime.strptime(value, DATEFORMAT))
+    separator, fields = DATE_FIELDS
+    values = dict(zip(fields, map(int, value.split(separator)), strict=True))
+    return days_from_civil(values["Y"], values["m"], values["d"])
+
+
+def format_day(day: int) -> str:
+    # the DATEFORMAT string of an epoch day
+    if DATE_FIELDS is None:
+        return from_epoch_day(day).strftime(DATEFORMAT)
+    separator, fields = DATE_FIELDS
+    year, month, day = civil_from_days(day)
+    values = {"d": day, "m": month, "Y": year}
+    return separator.join(str(values[field]).zfill(FIELD_WIDTHS[field]) for field in fields)
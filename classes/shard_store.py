@@ -0,0 +1,110 @@
+from typing import Any
+import json
+import os
+
+from classes.habit import BaseHabit
+from classes.storage import Store
+from helpers.files import atomic_write
+
+
+class ShardStore(Store):
+    """
+    Stores every habit in its own file inside a directory, next to a manifest
+    listing all uids and the app wide meta data. Only dirty habits are written,
+    the manifest only when habits were added or removed.
+
+    Layout:
+        <path>/manifest.json
+        <path>/habits/<uid>.json
+    """
+    uids: list[str]
+    meta: dict[str, Any]
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.uids = []
+        self.meta = {}
+        os.makedirs(os.path.join(path, "habits"), exist_ok=True)
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.path, "manifest.json")
+
+    def shard_path(self, uid: str) -> str:
+        return os.path.join(self.path, "habits", f"{uid}.json")
+
+    def load(self) -> tuple[dict[str, BaseHabit], dict[str, Any]]:
+        try:
+            with open(self.manifest_path, "r") as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            data = {}
+
+        habits = {}
+        for uid in data.get("habits", []):
+            try:
+                with open(self.shard_path(uid), "r") as file:
+                    habit = BaseHabit.from_dict(json.load(file))
+            except FileNotFoundError:
+                continue
+            habit.dirty = False
+            habits[uid] = habit
+
+        self.uids = list(habits)
+        self.meta = {k: v for k, v in data.items() if k != "habits"}
+        return habits, dict(self.meta)
+
+    def write_shard(self, habit: BaseHabit) -> None:
+        atomic_write(self.shard_path(habit.uid), json.dumps(habit.to_dict()))
+        habit.dirty = False
+
+    def write_manifest(self, habits: dict[str, BaseHabit], meta: dict[str, Any]) -> None:
+        data = {"habits": list(habits)}
+        data.update(meta)
+        atomic_write(self.manifest_path, json.dumps(data))
+        self.uids = list(habits)
+        self.meta = dict(meta)
+
+    def save(self, habits: dict[str, BaseHabit], meta: dict[str, Any]) -> None:
+        """
+        This method writes all dirty habits, the manifest and deletes removed shards
+
+        Args:
+            self (ShardStore)
+            habits (dict[str, BaseHabit]): All habits by uid
+            meta (dict): App wide meta data
+
+        Returns:
+            None
+        """
+        for habit in habits.values():
+            if habit.dirty:
+                self.write_shard(habit)
+
+        removed = [uid for uid in self.uids if uid not in habits]
+        if removed or list(habits) != self.uids or meta != self.meta:
+            self.write_manifest(habits, meta)
+        for uid in removed:
+            self.remove_shard(uid)
+
+    def remove_shard(self, uid: str) -> None:
+        try:
+            os.remove(self.shard_path(uid))
+        except FileNotFoundError:
+            pass
+
+    def commit(self, habits: dict[str, BaseHabit], meta: dict[str, Any], record: dict[str, Any]) -> None:
+        match record.get("op"):
+            case "add":
+                # the shard is written before the manifest references it
+                self.write_shard(habits[record["habit"]["uid"]])
+                self.write_manifest(habits, meta)
+            case "remove":
+                self.write_manifest(habits, meta)
+                self.remove_shard(record["uid"])
+            case _:
+                # only the shard is written, the manifest lists every uid and is rewritten
+                # on adds and removes, changed meta data is written with the next save
+                habit = habits.get(record.get("uid", ""))
+                if habit and habit.dirty:
+                    self.write_shard(habit)
@@ -0,0 +1,102 @@
+from bisect import bisect_left, insort
+from collections.abc import Iterator, Mapping
+from typing import Any, Callable, Optional
+
+from classes.habit import BaseHabit
+
+
+class SortedView(Mapping):
+    """
+    The habits of `source` in sorted order. The order is a list of (key, uid) pairs
+    kept sorted with bisect, so a habit whose key changed is repositioned without
+    sorting again. Descending views iterate the same list backwards.
+    The owner (see Filter.on_change) has to call add, discard and update on changes.
+    """
+    source: Mapping[str, BaseHabit]
+    key: Callable[[BaseHabit], Any]
+    reverse: bool
+    order: list[tuple[Any, str]]
+    entries: dict[str, tuple[Any, str]]  # the current entry of every uid in `order`
+
+    def __init__(self, source: Mapping[str, BaseHabit], key: Callable[[BaseHabit], Any], reverse: bool = False) -> None:
+        self.source = source
+        self.key = key
+        self.reverse = reverse
+        self.entries = {uid: (key(habit), uid) for uid, habit in source.items()}
+        self.order = sorted(self.entries.values())
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def __iter__(self) -> Iterator[str]:
+        for _, uid in reversed(self.order) if self.reverse else self.order:
+            yield uid
+
+    def __contains__(self, uid: object) -> bool:
+        return uid in self.entries
+
+    def __getitem__(self, uid: str) -> BaseHabit:
+        if uid not in self.entries:
+            raise KeyError(uid)
+        return self.source[uid]
+
+    def at(self, index: int) -> BaseHabit:
+        """
+        This method returns the habit at a position in constant time
+
+        Args:
+            self (SortedView)
+            index (int): The position, 0 being the first habit shown
+
+        Returns:
+            habit (BaseHabit): The habit, raises an IndexError if out of range
+        """
+        if not 0 <= index < len(self.order):
+            raise IndexError("view index out of range")
+        if self.reverse:
+            index = len(self.order) - 1 - index
+        return self.source[self.order[index][1]]
+
+    def index_of(self, uid: str) -> Optional[int]:
+        """
+        This method returns the position of a habit in logarithmic time
+
+        Args:
+            self (SortedView)
+            uid (str): The uid of the habit
+
+        Returns:
+            index (Optional[int]): The position or None if the habit is not part of the view
+        """
+        entry = self.entries.get(uid)
+        if entry is None:
+            return None
+        index = bisect_left(self.order, entry)
+        return len(self.order) - 1 - index if self.reverse else index
+
+    def add(self, habit: BaseHabit) -> None:
+        """
+        This method inserts a habit at its position or moves it there if its key changed
+
+        Args:
+            self (SortedView)
+            habit (BaseHabit): The habit
+
+        Returns:
+            None
+        """
+        entry = (self.key(habit), habit.uid)
+        old = self.entries.get(habit.uid)
+        if old == entry:
+            return
+        if old is not None:
+            del self.order[bisect_left(self.order, old)]
+        self.entries[habit.uid] = entry
+        insort(self.order, entry)
+
+    update = add
+
+    def discard(self, uid: str) -> None:
+        entry = self.entries.pop(uid, None)
+        if entry is not None:
+            del self.order[bisect_left(self.order, entry)]
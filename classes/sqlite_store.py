@@ -0,0 +1,233 @@
+from functools import partial
+from typing import Any, Iterable
+import json
+import sqlite3
+
+from classes.habit import BaseHabit
+from classes.clock import CLOCK
+from classes.history import History
+from classes.periods import format_day, parse_day
+from classes.storage import JsonStore, Store
+
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS habits (
+    uid TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    start TEXT NOT NULL,
+    completed INTEGER NOT NULL,
+    history_len INTEGER NOT NULL,
+    completions INTEGER NOT NULL DEFAULT 0,
+    current_streak INTEGER NOT NULL,
+    longest_streak INTEGER NOT NULL,
+    current_negative INTEGER NOT NULL,
+    longest_negative INTEGER NOT NULL,
+    closed_streak INTEGER NOT NULL,
+    closed_negative INTEGER NOT NULL,
+    previous_run INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS periods (
+    uid TEXT NOT NULL REFERENCES habits(uid) ON DELETE CASCADE,
+    idx INTEGER NOT NULL,
+    PRIMARY KEY (uid, idx)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS habits_interval ON habits(interval);
+CREATE INDEX IF NOT EXISTS habits_completed ON habits(completed);
+CREATE INDEX IF NOT EXISTS habits_current_streak ON habits(current_streak);
+CREATE INDEX IF NOT EXISTS habits_longest_streak ON habits(longest_streak);
+CREATE INDEX IF NOT EXISTS habits_current_negative ON habits(current_negative);
+CREATE INDEX IF NOT EXISTS habits_longest_negative ON habits(longest_negative);
+"""
+
+COLUMN_NAMES = (
+    "uid",
+    "name",
+    "interval",
+    "start",
+    "completed",
+    "history_len",
+    "completions",
+    "current_streak",
+    "longest_streak",
+    "current_negative",
+    "longest_negative",
+    "closed_streak",
+    "closed_negative",
+    "previous_run",
+)
+COLUMNS = ", ".join(COLUMN_NAMES)
+UPSERT = (
+    f"INSERT INTO habits ({COLUMNS}) VALUES ({', '.join('?' * len(COLUMN_NAMES))}) "
+    "ON CONFLICT(uid) DO UPDATE SET "
+    + ", ".join(f"{column} = excluded.{column}" for column in COLUMN_NAMES[1:])
+)
+
+class SqliteStore(Store):
+    """
+    Stores habits in a sqlite database. Every mutation becomes a single row
+    update, completions are kept as rows of the periods table.
+    In lazy mode the periods of a habit are only queried once its history is accessed.
+    """
+    conn: sqlite3.Connection
+    lazy: bool
+
+    def __init__(self, path: str, lazy: bool = False) -> None:
+        self.path = path
+        self.lazy = lazy
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+        self._upgrade()
+
+    def _upgrade(self) -> None:
+        # databases created before the completions column was introduced
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(habits)")]
+        if "completions" not in columns:
+            with self.conn:
+                self.conn.execute("ALTER TABLE habits ADD COLUMN completions INTEGER NOT NULL DEFAULT 0")
+                self.conn.execute(
+                    "UPDATE habits SET completions = (SELECT COUNT(*) FROM periods WHERE periods.uid = habits.uid)"
+                )
+
+    @staticmethod
+    def _row(habit: BaseHabit) -> tuple:
+        return (
+            habit.uid,
+            habit.name,
+            habit.interval,
+            # the start column keeps DATEFORMAT text, so the database stays readable
+            format_day(habit.start_day),
+            habit.completed,
+            habit.periods,
+            habit.completions,
+            habit.current_streak,
+            habit.longest_streak,
+            habit.current_negative,
+            habit.longest_negative,
+            habit.closed_streak,
+            habit.closed_negative,
+            habit.previous_run,
+        )
+
+    @staticmethod
+    def _from_row(row: tuple) -> BaseHabit:
+        habit = BaseHabit.create(row[1], row[2])
+        habit.uid = row[0]
+        habit.start_day = parse_day(row[3])
+        habit.completed = row[4]
+        (
+            habit.current_streak,
+            habit.longest_streak,
+            habit.current_negative,
+            habit.longest_negative,
+            habit.closed_streak,
+            habit.closed_negative,
+            habit.previous_run,
+        ) = row[7:]
+        return habit
+
+    def _load_history(self, uid: str, length: int) -> History:
+        history = History()
+        history.extend(0, length)
+        for (idx,) in self.conn.execute("SELECT idx FROM periods WHERE uid = ?", (uid,)):
+            history[idx] = 1
+        return history
+
+    def _upsert(self, habits: Iterable[BaseHabit]) -> None:
+        # a real upsert, INSERT OR REPLACE would delete the row and cascade to its periods
+        self.conn.executemany(UPSERT, (self._row(habit) for habit in habits))
+
+    def _insert_periods(self, habit: BaseHabit) -> None:
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO periods (uid, idx) VALUES (?, ?)",
+            ((habit.uid, i) for i, value in enumerate(habit.history) if value),
+        )
+
+    def load(self) -> tuple[dict[str, BaseHabit], dict[str, Any]]:
+        rows = self.conn.execute(f"SELECT {COLUMNS} FROM habits").fetchall()
+        habits = {row[0]: self._from_row(row) for row in rows}
+        if self.lazy:
+            for row in rows:
+                loader = partial(self._load_history, row[0], row[5])
+                habits[row[0]].set_history_loader(loader, row[5], row[6])
+        else:
+            histories = {}
+            for row in rows:
+                history = History()
+                history.extend(0, row[5])
+                histories[row[0]] = history
+            for uid, idx in self.conn.execute("SELECT uid, idx FROM periods"):
+                histories[uid][idx] = 1
+            for uid, history in histories.items():
+                habits[uid].history = history
+
+        # persist the rollover, so the cached streak columns stay queryable
+        rolled = []
+        today = CLOCK.day()
+        for habit in habits.values():
+            length = habit.periods
+            habit.check_day(today)
+            if habit.periods != length:
+                rolled.append(habit)
+        with self.conn:
+            self._upsert(rolled)
+
+        meta = {key: json.loads(value) for key, value in self.conn.execute("SELECT key, value FROM meta")}
+        return habits, meta
+
+    def save(self, habits: dict[str, BaseHabit], meta: dict[str, Any]) -> None:
+        with self.conn:
+            self.conn.execute("DELETE FROM habits")
+            self._upsert(habits.values())
+            for habit in habits.values():
+                self._insert_periods(habit)
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                ((key, json.dumps(value)) for key, value in meta.items()),
+            )
+
+    def commit(self, habits: dict[str, BaseHabit], meta: dict[str, Any], record: dict[str, Any]) -> None:
+        with self.conn:
+            match record.get("op"):
+                case "add":
+                    habit = habits[record["habit"]["uid"]]
+                    self._upsert([habit])
+                    self._insert_periods(habit)
+                case "remove":
+                    self.conn.execute("DELETE FROM habits WHERE uid = ?", (record["uid"],))
+                case "toggle":
+                    habit = habits[record["uid"]]
+                    self._upsert([habit])
+                    idx = habit.periods - 1
+                    if habit.completed:
+                        self.conn.execute("INSERT OR IGNORE INTO periods (uid, idx) VALUES (?, ?)", (habit.uid, idx))
+                    else:
+                        self.conn.execute("DELETE FROM periods WHERE uid = ? AND idx = ?", (habit.uid, idx))
+
+    def migrate(self, json_path: str) -> int:
+        """
+        This method imports an existing json save file (including its journal) into the database
+
+        Args:
+            self (SqliteStore)
+            json_path (str): Path to the json save file
+
+        Returns:
+            count (int): The number of imported habits
+        """
+        source = JsonStore(json_path, journal=True)
+        habits, meta = source.load()
+        source.close()
+        self.save(habits, meta)
+        return len(habits)
+
+    def close(self) -> None:
+        self.conn.close()
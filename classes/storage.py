@@ -0,0 +1,298 @@
+from abc import ABC, abstractmethod
+from typing import Any, Optional
+import asyncio
+import json
+import threading
+
+from classes.clock import CLOCK
+from classes.habit import BaseHabit
+from classes.journal import Journal
+from classes.periods import parse_day
+from classes.streaks import recalculate_streaks
+from helpers.files import atomic_write
+
+
+class Store(ABC):
+    """
+    A persistence backend for the App. Stores receive the mutation records
+    produced by the App and decide how to persist them.
+    """
+    path: str
+
+    @abstractmethod
+    def load(self) -> tuple[dict[str, BaseHabit], dict[str, Any]]:
+        """
+        This method loads all habits and rolls them over to the current interval.
+        Since the rollover is derived again on every load, stores don't have to persist it.
+
+        Args:
+            self (Store)
+
+        Returns:
+            (habits, meta)((dict[str, BaseHabit], dict)): The habits by uid and app wide meta data
+        """
+        pass
+
+    @abstractmethod
+    def save(self, habits: dict[str, BaseHabit], meta: dict[str, Any]) -> None:
+        """
+        This method persists the full state
+
+        Args:
+            self (Store)
+            habits (dict[str, BaseHabit]): All habits by uid
+            meta (dict): App wide meta data
+
+        Returns:
+            None
+        """
+        pass
+
+    def commit(self, habits: dict[str, BaseHabit], meta: dict[str, Any], record: dict[str, Any]) -> None:
+        """
+        This method persists a single mutation. By default the full state is saved.
+
+        Args:
+            self (Store)
+            habits (dict[str, BaseHabit]): All habits by uid, already containing the mutation
+            meta (dict): App wide meta data
+            record (dict): The mutation, e.g. {"op": "toggle", "uid": ...}
+
+        Returns:
+            None
+        """
+        self.save(habits, meta)
+
+    async def save_async(self, habits: dict[str, BaseHabit], meta: dict[str, Any]) -> None:
+        """
+        This method persists the full state from an event loop. Stores that can write
+        in the background override it, by default the state is saved right away.
+
+        Args:
+            self (Store)
+            habits (dict[str, BaseHabit]): All habits by uid
+            meta (dict): App wide meta data
+
+        Returns:
+            None
+        """
+        self.save(habits, meta)
+
+    def backlog(self) -> int:
+        """
+        This method tells whether a full save would shorten the next load, e.g. by compacting a journal
+
+        Args:
+            self (Store)
+
+        Returns:
+            records (int): The number of mutations that are not part of the full state yet
+        """
+        return 0
+
+    def close(self) -> None:
+        pass
+
+
+def apply_record(habits: dict[str, BaseHabit], record: dict[str, Any]) -> None:
+    """
+    This function replays a single mutation record onto the loaded habits
+
+    Args:
+        habits (dict[str, BaseHabit]): The habits by uid
+        record (dict): A record as written by App.commit
+
+    Returns:
+        None
+    """
+    match record.get("op"):
+        case "add":
+            habit = BaseHabit.from_dict(record["habit"], check=False)
+            habits[habit.uid] = habit
+        case "remove":
+            habits.pop(record["uid"], None)
+        case "toggle":
+            habit = habits.get(record["uid"])
+            if not habit:
+                return
+            # roll the habit over to the period the toggle happened in
+            habit.check_day(parse_day(record["period"]))
+            if habit.completed != record["completed"]:
+                habit.toggle_completed()
+
+
+class SnapshotStore(Store):
+    """
+    Stores all habits in a single snapshot file. In journal mode mutations are
+    appended to `<path>.journal` and folded into the snapshot once it grows large.
+    Subclasses define the file format of the snapshot.
+    """
+    journal: Optional[Journal]
+    lazy: bool
+    lock: threading.Lock  # held while a snapshot file is replaced
+    dumped: int  # number of serialized snapshots
+    replaced: int  # number of the snapshot on disk
+
+    def __init__(self, path: str, journal: bool = False, lazy: bool = False) -> None:
+        self.path = path
+        self.journal = Journal(f"{path}.journal") if journal else None
+        self.lazy = lazy
+        self.lock = threading.Lock()
+        self.dumped = 0
+        self.replaced = 0
+
+    @abstractmethod
+    def read_snapshot(self) -> tuple[dict[str, BaseHabit], dict[str, Any], int]:
+        """
+        This method reads the snapshot without rolling the habits over
+
+        Args:
+            self (SnapshotStore)
+
+        Returns:
+            (habits, meta, seq)((dict[str, BaseHabit], dict, int)): The habits by uid, meta data and the journal sequence number of the snapshot
+        """
+        pass
+
+    @abstractmethod
+    def dump_snapshot(self, habits: dict[str, BaseHabit], meta: dict[str, Any], seq: int) -> str | bytes:
+        """
+        This method serializes the snapshot in the file format of the store
+
+        Args:
+            self (SnapshotStore)
+            habits (dict[str, BaseHabit]): All habits by uid
+            meta (dict): App wide meta data
+            seq (int): The journal sequence number contained in the snapshot
+
+        Returns:
+            content (str | bytes): The content of the snapshot file
+        """
+        pass
+
+    def write_snapshot(self, habits: dict[str, BaseHabit], meta: dict[str, Any], seq: int) -> None:
+        self.dumped += 1
+        self.replace_snapshot(self.dump_snapshot(habits, meta, seq), self.dumped)
+
+    def replace_snapshot(self, content: str | bytes, number: int) -> None:
+        """
+        This method renames a serialized snapshot over the save file. A save may compact the
+        journal while save_async is still writing on a worker thread, so a snapshot that is
+        older than the one on disk is dropped instead of undoing the compaction.
+
+        Args:
+            self (SnapshotStore)
+            content (str | bytes): The serialized snapshot
+            number (int): The number of the snapshot, see `dumped`
+
+        Returns:
+            None
+        """
+        with self.lock:
+            if number <= self.replaced:
+                return
+            atomic_write(self.path, content)
+            self.replaced = number
+
+    def load(self) -> tuple[dict[str, BaseHabit], dict[str, Any]]:
+        habits, meta, seq = self.read_snapshot()
+        if self.journal:
+            for record in self.journal.replay(seq):
+                apply_record(habits, record)
+        today = CLOCK.day()
+        for habit in habits.values():
+            habit.check_day(today)
+
+        if self.journal and self.journal.needs_compaction():
+            self.save(habits, meta)
+        return habits, meta
+
+    def save(self, habits: dict[str, BaseHabit], meta: dict[str, Any]) -> None:
+        """
+        This method writes a full snapshot of all habits. In journal mode this
+        compacts the journal, since all of its records are now part of the snapshot.
+
+        Args:
+            self (SnapshotStore)
+            habits (dict[str, BaseHabit]): All habits by uid
+            meta (dict): App wide meta data
+
+        Returns:
+            None
+        """
+        self.write_snapshot(habits, meta, self.journal.seq if self.journal else 0)
+        if self.journal:
+            self.journal.truncate()
+
+    async def save_async(self, habits: dict[str, BaseHabit], meta: dict[str, Any]) -> None:
+        """
+        This method serializes the snapshot on the event loop, so it is consistent, and
+        writes it on a worker thread. Records appended in the meantime are not part of the
+        snapshot, the journal is only compacted if there were none.
+
+        Args:
+            self (SnapshotStore)
+            habits (dict[str, BaseHabit]): All habits by uid
+            meta (dict): App wide meta data
+
+        Returns:
+            None
+        """
+        seq = self.journal.seq if self.journal else 0
+        self.dumped += 1
+        await asyncio.to_thread(self.replace_snapshot, self.dump_snapshot(habits, meta, seq), self.dumped)
+        if self.journal and self.journal.seq == seq:
+            self.journal.truncate()
+
+    def backlog(self) -> int:
+        return self.journal.records if self.journal else 0
+
+    def commit(self, habits: dict[str, BaseHabit], meta: dict[str, Any], record: dict[str, Any]) -> None:
+        if not self.journal:
+            self.save(habits, meta)
+            return
+
+        self.journal.append(record)
+        if self.journal.needs_compaction():
+            self.save(habits, meta)
+
+    def close(self) -> None:
+        if self.journal:
+            self.journal.close()
+
+
+class JsonStore(SnapshotStore):
+    """
+    Stores the snapshot as json. The temporary file is renamed over the old one,
+    so readers never see a half-written snapshot.
+    In lazy mode histories are only decoded once they are accessed.
+    """
+
+    def read(self) -> dict[str, Any]:
+        try:
+            with open(self.path, "r") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            # we just start from scratch if no savedata is found,
+            # a journal may still exist without a snapshot
+            return {}
+
+    def parse(self, data: dict[str, Any]) -> tuple[dict[str, BaseHabit], dict[str, Any], int]:
+        items = data.get("habits", {})
+        habits = {k: BaseHabit.from_dict(v, check=False, lazy=self.lazy, calculate=False) for k, v in items.items()}
+        # old save files don't contain the run state, their streaks are calculated in one batch
+        recalculate_streaks(habits[k] for k, v in items.items() if "run_state" not in v)
+        meta = {k: v for k, v in data.items() if k not in ("habits", "journal_seq")}
+        return habits, meta, data.get("journal_seq", 0)
+
+    def read_snapshot(self) -> tuple[dict[str, BaseHabit], dict[str, Any], int]:
+        return self.parse(self.read())
+
+    def dump_snapshot(self, habits: dict[str, BaseHabit], meta: dict[str, Any], seq: int) -> str:
+        data = {}
+        data["habits"] = {k: v.to_dict() for k, v in habits.items()}
+        data.update(meta)
+        if self.journal:
+            data["journal_seq"] = seq
+
+        return json.dumps(data)
@@ -0,0 +1,140 @@
+from typing import Iterable, NamedTuple, Sequence
+
+from classes.habit import BaseHabit
+from classes.history import History
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, the pure python path is used instead
+    np = None
+
+
+class Streaks(NamedTuple):
+    """
+    The streaks of a single history, as computed by BaseHabit.calculate_streaks
+    """
+    current_streak: int
+    longest_streak: int
+    current_negative: int
+    longest_negative: int
+    closed_streak: int
+    closed_negative: int
+    previous_run: int
+
+
+def compute_streaks(histories: Sequence[History], vectorized: bool = True) -> list[Streaks]:
+    """
+    This function computes the streaks of many histories at once
+
+    Args:
+        histories (Sequence[History]): The histories
+        vectorized (bool): Whether numpy should be used if it is installed. Defaults to True
+
+    Returns:
+        streaks (list[Streaks]): The streaks of every history, in the same order
+    """
+    if vectorized and np is not None and histories:
+        return _compute_numpy(histories)
+    return [_compute_python(history) for history in histories]
+
+
+def recalculate_streaks(habits: Iterable[BaseHabit]) -> None:
+    """
+    This function recalculates the streaks and run state of all habits, e.g. after a bulk import.
+    The result is the same as calling BaseHabit.calculate_streaks on every habit.
+
+    Args:
+        habits (Iterable[BaseHabit]): The habits to be updated
+
+    Returns:
+        None
+    """
+    habits = list(habits)
+    histories = [habit.history for habit in habits]
+    for habit, history, streaks in zip(habits, histories, compute_streaks(histories)):
+        (
+            habit.current_streak,
+            habit.longest_streak,
+            habit.current_negative,
+            habit.longest_negative,
+            habit.closed_streak,
+            habit.closed_negative,
+            habit.previous_run,
+        ) = streaks
+        habit.periods = len(history)
+        habit.completions = history.count()
+        # drops the cached values and lets the observer (e.g. the leaderboards) reposition the habit
+        habit.invalidate()
+
+
+def _compute_python(history: History) -> Streaks:
+    # the runs are found with string operations, which run in C
+    length = len(history)
+    if not length:
+        return Streaks(0, 0, 0, 0, 0, 0, 0)
+    bits = int.from_bytes(history.bits, "little") & ((1 << length) - 1)
+    values = format(bits, "b").zfill(length)[::-1]
+
+    last = values[-1]
+    rest = values.rstrip(last)
+    current = length - len(rest)
+    previous_run = len(rest) - len(rest.rstrip(rest[-1])) if rest else 0
+
+    # the current run is not closed yet
+    positive = [len(run) for run in values.split("0")]
+    negative = [len(run) for run in values.split("1")]
+    if last == "1":
+        closed_streak = max(positive[:-1], default=0)
+        closed_negative = max(negative)
+        return Streaks(current, max(closed_streak, current), 0, closed_negative, closed_streak, closed_negative, previous_run)
+    closed_streak = max(positive)
+    closed_negative = max(negative[:-1], default=0)
+    return Streaks(0, closed_streak, current, max(closed_negative, current), closed_streak, closed_negative, previous_run)
+
+
+def _compute_numpy(histories: Sequence[History]) -> list[Streaks]:
+    count = len(histories)
+    lengths = np.fromiter((len(history) for history in histories), dtype=np.int64, count=count)
+    total = int(lengths.sum())
+    if not total:
+        return [Streaks(0, 0, 0, 0, 0, 0, 0)] * count
+
+    # unpack all histories into one ragged bit array, dropping the padding of every last byte
+    packed = np.frombuffer(b"".join(bytes(history.bits) for history in histories), dtype=np.uint8)
+    unpacked = np.unpackbits(packed, bitorder="little")
+    padded_starts = np.concatenate(([0], np.cumsum((lengths + 7) // 8 * 8)[:-1]))
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    bits = unpacked[np.repeat(padded_starts - starts, lengths) + np.arange(total)]
+
+    # run-length encode, a run also ends at every history boundary
+    boundary = np.zeros(total, dtype=bool)
+    boundary[starts[lengths > 0]] = True
+    boundary[1:] |= bits[1:] != bits[:-1]
+    run_starts = np.flatnonzero(boundary)
+    run_lengths = np.diff(np.append(run_starts, total))
+    run_values = bits[run_starts].astype(bool)
+    run_habits = np.repeat(np.arange(count), lengths)[run_starts]
+
+    # the last run of every history is its current run
+    last_run = np.searchsorted(run_habits, np.arange(count), side="right") - 1
+    has_runs = lengths > 0
+    is_last = np.zeros(len(run_starts), dtype=bool)
+    is_last[last_run[has_runs]] = True
+    current = np.where(has_runs, run_lengths[last_run], 0)
+    current_positive = np.where(has_runs & run_values[last_run], current, 0)
+    current_negative = np.where(has_runs & ~run_values[last_run], current, 0)
+
+    closed_positive = np.zeros(count, dtype=np.int64)
+    closed_negative = np.zeros(count, dtype=np.int64)
+    closed = ~is_last
+    np.maximum.at(closed_positive, run_habits[closed & run_values], run_lengths[closed & run_values])
+    np.maximum.at(closed_negative, run_habits[closed & ~run_values], run_lengths[closed & ~run_values])
+
+    previous = last_run - 1
+    has_previous = has_runs & (previous >= 0) & (run_habits[np.maximum(previous, 0)] == np.arange(count))
+    previous_run = np.where(has_previous, run_lengths[np.maximum(previous, 0)], 0)
+
+    longest_positive = np.maximum(closed_positive, current_positive)
+    longest_negative = np.maximum(closed_negative, current_negative)
+    columns = (current_positive, longest_positive, current_negative, longest_negative, closed_positive, closed_negative, previous_run)
+    return [Streaks(*values) for values in zip(*(column.tolist() for column in columns))]
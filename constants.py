@@ -10,6 +10,7 @@ CLEAR_SCREEN = "\033[2J"
 CURSOR_HOME = "\033[H"
 
 
-# Globalize for efficiency since it won't change
+# The date the process was started at. Use CLOCK.today() (classes/clock.py)
+# for the current date, long running processes outlive this one
 TODAY = datetime.today()
 DATEFORMAT = "%d-%m-%Y"
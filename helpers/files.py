@@ -0,0 +1,41 @@
+import os
+import tempfile
+
+
+def atomic_write(path: str, content: str | bytes) -> None:
+    """
+    This function writes `content` to a temporary file next to `path` and then
+    atomically renames it over `path`. Readers either see the old or the new file,
+    never a half-written one.
+
+    Args:
+        path (str): The destination file
+        content (str | bytes): The data to be written
+
+    Returns:
+        None
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    mode = "wb" if isinstance(content, bytes) else "w"
+    try:
+        # mkstemp creates private files, keep the permissions a plain open() would use
+        os.chmod(tmp_path, file_mode(path))
+        with os.fdopen(fd, mode) as file:
+            file.write(content)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def file_mode(path: str) -> int:
+    try:
+        return os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
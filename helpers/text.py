@@ -42,6 +42,11 @@ def bold(string: str) -> str:
     return text_format(["bold"], string)
 
 
+# Cells of the history strips, indexed by the value of the interval. They are
+# formatted once instead of on every redraw
+HISTORY_GLYPHS = (red("■"), green("■"))
+
+
 def percentage_gradient(f32: float) -> str:
     """
     This function evaluates a percentage into three colorized areas: (1) greeen, when x > 80%, (2) yellow, when 80 > x > 30, and (3) red, when x < 30
@@ -1,9 +1,69 @@
+import argparse
+
 from classes.application import App
+from classes.binary_store import convert
+from classes.sqlite_store import SQLITE_EXTENSIONS, SqliteStore
 
 from ui.ui import UI
 
 
 if __name__ == "__main__":
-    app = App.get_or_init("habits.json")
-    ui = UI(app)
-    ui.main_loop()
+    parser = argparse.ArgumentParser(description="Terminal habit tracker")
+    parser.add_argument(
+        "--store",
+        default="habits.json",
+        help="save file or directory, sqlite is used for .db/.sqlite/.sqlite3 and the binary format for .bin files (default: habits.json)",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="fold the journal into a fresh snapshot and exit",
+    )
+    parser.add_argument(
+        "--autosave",
+        type=float,
+        metavar="SECONDS",
+        help="save json snapshots in the background instead of journaling, coalescing changes for SECONDS",
+    )
+    parser.add_argument(
+        "--columnar",
+        action="store_true",
+        help="keep habits in compact columns instead of one object per habit, for very large save files",
+    )
+    parser.add_argument(
+        "--migrate",
+        metavar="JSON",
+        help="import a json save file into the sqlite --store and exit",
+    )
+    parser.add_argument(
+        "--convert",
+        nargs=2,
+        metavar=("SOURCE", "TARGET"),
+        help="copy all habits from one save file into another, e.g. habits.json habits.bin, and exit",
+    )
+    args = parser.parse_args()
+
+    if args.convert:
+        source, target = (App.open_store(path, journal=True) for path in args.convert)
+        count = convert(source, target)
+        source.close()
+        target.close()
+        print(f"Converted {count} habits into {args.convert[1]}")
+        raise SystemExit(0)
+
+    if args.migrate:
+        if not args.store.endswith(SQLITE_EXTENSIONS):
+            parser.error(f"--migrate needs a sqlite --store ({', '.join(SQLITE_EXTENSIONS)}), got {args.store}")
+        store = SqliteStore(args.store)
+        count = store.migrate(args.migrate)
+        store.close()
+        print(f"Migrated {count} habits into {args.store}")
+        raise SystemExit(0)
+
+    app = App.get_or_init(args.store, journal=True, autosave=args.autosave, lazy=True, columnar=args.columnar)
+    if args.compact:
+        app.save()
+        app.close()
+    else:
+        ui = UI(app)
+        ui.main_loop()
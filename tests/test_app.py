@@ -1,8 +1,15 @@
+import asyncio
 import json
-from os import remove
+import shutil
+import threading
+from os import listdir, path, remove
 import unittest
 from classes.application import App
+from classes.autosave import AutosaveStore
+from classes.binary_store import convert
 from classes.habit import BaseHabit
+from classes.sqlite_store import SqliteStore
+from classes.storage import JsonStore
 
 # Run instructions:
 # python -m unittest tests/test_app.py
@@ -18,7 +25,18 @@ Tested?
 [ ] get_or_init
 [ ] save  
 [ ] add_habit  
-[ ] habit_at_index  
+[x] habit_at_index  
+[x] index_of
+[x] commit
+[x] save                # compaction in journal mode
+[x] get_or_init         # sqlite store
+[x] close               # autosave flush
+[x] get_or_init         # sharded directory store
+[x] get_or_init         # binary store
+[x] save_async          # records committed while the snapshot is written
+[x] save_async          # compaction while the snapshot is written
+# storage
+[x] apply_record        # by extension of App.get_or_init in journal mode
 """
 
 
@@ -50,6 +68,7 @@ class TestApp(unittest.TestCase):
         Tested methods:
         1. App.save
         2. App.add_habit
+        3. App.meta
         """
         app = App()
         app.save_path = "tests.json.tmp"
@@ -62,6 +81,10 @@ class TestApp(unittest.TestCase):
         app2 = App.get_or_init(app.save_path)
         self.assertEqual(len(app2.filter.base.values()), 2) # check if habits were loaded
 
+        # the leader is saved along with the habits
+        with open(app.save_path) as f:
+            self.assertEqual(json.load(f)["longest_streak"], app2.longest_streak)
+
         # check if the items are the same
         for (a, b) in zip(app.filter.base.values(), app2.filter.base.values()):
             self.assertEqual(a, b)
@@ -74,8 +97,9 @@ class TestApp(unittest.TestCase):
         """
         Tested methods:
         1. App.habit_at_index
-        2. Filter.apply_filter # by extension
-        3. Filter.apply_sorter # by extension
+        2. App.index_of
+        3. Filter.apply_filter # by extension
+        4. Filter.apply_sorter # by extension
         """
         app = App()
         app.save_path = "tests.json.tmp"
@@ -95,6 +119,341 @@ class TestApp(unittest.TestCase):
         if first:
             self.assertEqual(first.name, "Example Habit1") # if true, sorting works too
 
+        # positions follow the habits
+        self.assertIsNone(app.habit_at_index(2))
+        self.assertIsNone(app.habit_at_index(-1))
+        if first:
+            self.assertEqual(app.index_of(first.uid), 0)
+            app.filter.apply_sorting("name")
+            self.assertEqual(app.index_of(first.uid), 1)
+            app.filter.apply_filter("monthly")
+            self.assertIsNone(app.index_of(first.uid))
+
+    def test_journal(self):
+        """
+        Tested methods:
+        1. App.commit
+        2. apply_record # by extension
+        3. App.get_or_init # in journal mode
+        """
+        save_path = "tests.json.tmp"
+        app = App.get_or_init(save_path, journal=True)
+        app.add_habit("Example Habit1", "weekly")
+        app.add_habit("Example Habit2", "daily")
+        app.add_habit("Example Habit3", "monthly")
+        app.save()
+
+        # mutations after the snapshot only live in the journal
+        habit = app.habit_at_index(0)
+        self.assertIsNot(habit, None)
+        if habit:
+            app.toggle_habit(habit)
+        removed = app.habit_at_index(2)
+        if removed:
+            app.remove_habit(removed.uid)
+        app.add_habit("Example Habit4", "daily")
+        app.close()
+
+        app2 = App.get_or_init(save_path, journal=True)
+        self.assertEqual(app2.filter.base.keys(), app.filter.base.keys())
+        for uid, habit in app.filter.base.items():
+            self.assertEqual(habit, app2.filter.base[uid])
+            self.assertEqual(habit.completed, app2.filter.base[uid].completed)
+        app2.close()
+
+        remove(save_path)
+        remove(f"{save_path}.journal")
+
+    def test_save_async(self):
+        """
+        Tested methods:
+        1. App.save_async
+        2. Store.backlog # by extension
+        """
+        save_path = "tests.json.tmp"
+        app = App.get_or_init(save_path, journal=True)
+        for i in range(3):
+            app.add_habit(f"Example Habit{i}", "daily")
+        self.assertEqual(app.get_store().backlog(), 3)
+
+        async def save_while_committing():
+            save = asyncio.create_task(app.save_async())
+            # the snapshot was taken when the task started, this record is only in the journal
+            await asyncio.sleep(0)
+            app.add_habit("Example Habit3", "daily")
+            await save
+
+        asyncio.run(save_while_committing())
+        # the journal still contains the record, it is compacted by the next save
+        self.assertEqual(app.get_store().backlog(), 4)
+        asyncio.run(app.save_async())
+        self.assertEqual(app.get_store().backlog(), 0)
+        app.add_habit("Example Habit4", "daily")
+        asyncio.run(save_while_committing())
+        app.close()
+
+        app2 = App.get_or_init(save_path, journal=True)
+        self.assertEqual(len(app2.filter.base), 6)
+        app2.close()
+
+        remove(save_path)
+        remove(f"{save_path}.journal")
+
+    def test_save_async_compaction(self):
+        """
+        Tested methods:
+        1. App.save_async # a compaction finishes first
+        2. SnapshotStore.replace_snapshot
+        """
+        save_path = "tests.json.tmp"
+        app = App.get_or_init(save_path, journal=True)
+        store = app.get_store()
+        self.assertIsInstance(store, JsonStore)
+        if isinstance(store, JsonStore) and store.journal:
+            store.journal.max_records = 3
+            for i in range(2):
+                app.add_habit(f"Example Habit{i}", "daily")
+
+            compacted = threading.Event()
+            replace_snapshot = store.replace_snapshot
+
+            def replace_after_compaction(content, number):
+                compacted.wait(5)
+                replace_snapshot(content, number)
+
+            async def compact_while_saving():
+                store.replace_snapshot = replace_after_compaction
+                save = asyncio.create_task(app.save_async())
+                await asyncio.sleep(0.05)
+                # the third record compacts the journal before the older snapshot is written
+                store.replace_snapshot = replace_snapshot
+                app.add_habit("Example Habit2", "daily")
+                compacted.set()
+                await save
+
+            asyncio.run(compact_while_saving())
+            self.assertEqual(store.journal.records, 0)
+        app.close()
+
+        app2 = App.get_or_init(save_path, journal=True)
+        self.assertEqual(len(app2.filter.base), 3)
+        app2.close()
+
+        remove(save_path)
+        remove(f"{save_path}.journal")
+
+    def test_compaction(self):
+        """
+        Tested methods:
+        1. App.commit # compaction once the journal passes its threshold
+        2. App.save
+        """
+        save_path = "tests.json.tmp"
+        app = App.get_or_init(save_path, journal=True)
+        journal = app.store.journal if isinstance(app.store, JsonStore) else None
+        self.assertIsNot(journal, None)
+        if journal:
+            journal.max_records = 5
+
+        for i in range(7):
+            app.add_habit(f"Example Habit{i}", "daily")
+
+        # the fifth record triggered a compaction, two records remain
+        if journal:
+            self.assertEqual(journal.records, 2)
+        with open(save_path, "r") as f:
+            self.assertEqual(len(json.load(f)["habits"]), 5)
+
+        # a torn record at the end is ignored and cut off
+        with open(f"{save_path}.journal", "a") as f:
+            f.write('{"op":"remove","ui')
+        app.close()
+
+        app2 = App.get_or_init(save_path, journal=True)
+        self.assertEqual(len(app2.filter.base), 7)
+        first = app2.habit_at_index(0)
+        if first:
+            app2.remove_habit(first.uid)
+        app2.close()
+
+        app3 = App.get_or_init(save_path, journal=True)
+        self.assertEqual(len(app3.filter.base), 6)
+        app3.close()
+
+        remove(save_path)
+        remove(f"{save_path}.journal")
+
+    def test_sqlite(self):
+        """
+        Tested methods:
+        1. App.get_or_init # with a sqlite store
+        2. App.commit
+        3. Filter.apply_filter
+        4. SqliteStore.migrate
+        """
+        save_path = "tests.tmp.db"
+        app = App.get_or_init(save_path)
+        app.add_habit("Example Habit1", "weekly")
+        app.add_habit("Example Habit2", "daily")
+        app.add_habit("Example Habit3", "monthly")
+        for habit in list(app.filter.base.values())[:2]:
+            app.toggle_habit(habit)
+        app.remove_habit(list(app.filter.base)[1])
+
+        app.filter.apply_filter("completed")
+        self.assertEqual([h.name for h in app.filter.tmp.values()], ["Example Habit1"])
+        app.filter.apply_filter("monthly")
+        self.assertEqual([h.name for h in app.filter.tmp.values()], ["Example Habit3"])
+        app.close()
+
+        app2 = App.get_or_init(save_path, lazy=True)
+        self.assertEqual(app2.filter.base.keys(), app.filter.base.keys())
+        self.assertFalse(any(habit.is_loaded() for habit in app2.filter.base.values()))
+        for uid, habit in app.filter.base.items():
+            self.assertEqual(habit, app2.filter.base[uid])
+
+        # toggling a loaded habit again keeps its earlier completions
+        habit = app2.filter.base[list(app.filter.base)[0]]
+        app2.toggle_habit(habit)
+        app2.toggle_habit(habit)
+        app2.close()
+        app2 = App.get_or_init(save_path)
+        self.assertEqual(app2.filter.base[habit.uid], habit)
+        app2.close()
+
+        # migrate a json save file
+        json_path = "tests.json.tmp"
+        source = App()
+        source.save_path = json_path
+        source.add_habit("Example Habit4", "daily")
+        store = SqliteStore(save_path)
+        self.assertEqual(store.migrate(json_path), 1)
+        store.close()
+
+        app3 = App.get_or_init(save_path)
+        self.assertEqual(list(app3.filter.base.values()), list(source.filter.base.values()))
+        app3.close()
+
+        remove(json_path)
+        for suffix in ("", "-wal", "-shm"):
+            if path.exists(save_path + suffix):
+                remove(save_path + suffix)
+
+    def test_autosave(self):
+        """
+        Tested methods:
+        1. App.get_or_init # with autosave
+        2. App.commit
+        3. App.close # flushes pending changes
+        """
+        save_path = "tests.json.tmp"
+        # a long window, nothing is written before the flush
+        app = App.get_or_init(save_path, autosave=60)
+        app.add_habit("Example Habit1", "weekly")
+        app.add_habit("Example Habit2", "daily")
+        habit = app.habit_at_index(0)
+        if habit:
+            app.toggle_habit(habit)
+        self.assertFalse(path.exists(save_path))
+
+        app.close()
+        app2 = App.get_or_init(save_path)
+        self.assertEqual(app2.filter.base.keys(), app.filter.base.keys())
+        for uid, habit in app.filter.base.items():
+            self.assertEqual(habit, app2.filter.base[uid])
+            self.assertEqual(habit.completed, app2.filter.base[uid].completed)
+
+        # a short window writes on its own
+        app3 = App.get_or_init(save_path, autosave=0)
+        app3.remove_habit(list(app3.filter.base)[0])
+        store = app3.store
+        if isinstance(store, AutosaveStore):
+            with store.condition:
+                store.condition.wait_for(lambda: store.written == store.generation, timeout=5)
+        self.assertEqual(len(App.get_or_init(save_path).filter.base), 1)
+        app3.close()
+
+        remove(save_path)
+
+    def test_shards(self):
+        """
+        Tested methods:
+        1. App.get_or_init # with a directory store
+        2. App.commit # only dirty shards are written, the manifest only on adds and removes
+        """
+        save_path = "tests.shards.tmp/"
+        app = App.get_or_init(save_path)
+        app.add_habit("Example Habit1", "weekly")
+        app.add_habit("Example Habit2", "daily")
+        app.add_habit("Example Habit3", "monthly")
+        self.assertFalse(any(h.dirty for h in app.filter.base.values()))
+
+        first, second, third = app.filter.base.values()
+        # a toggle writes the shard of the habit only, not the manifest
+        manifest = path.join(save_path, "manifest.json")
+        with open(manifest) as f:
+            before = f.read()
+        app.toggle_habit(first)
+        self.assertFalse(first.dirty)
+        with open(manifest) as f:
+            self.assertEqual(f.read(), before)
+        app.remove_habit(third.uid)
+        self.assertEqual(sorted(listdir(path.join(save_path, "habits"))), sorted(f"{uid}.json" for uid in (first.uid, second.uid)))
+
+        # a full save only rewrites dirty habits
+        second.toggle_completed()
+        app.save()
+        self.assertFalse(second.dirty)
+
+        app2 = App.get_or_init(save_path)
+        self.assertEqual(list(app2.filter.base), [first.uid, second.uid])
+        for uid, habit in app.filter.base.items():
+            self.assertEqual(habit, app2.filter.base[uid])
+            self.assertEqual(habit.completed, app2.filter.base[uid].completed)
+
+        shutil.rmtree(save_path)
+
+    def test_binary(self):
+        """
+        Tested methods:
+        1. App.get_or_init # with a binary store
+        2. binary_store.convert
+        """
+        json_path = "tests.json.tmp"
+        save_path = "tests.tmp.bin"
+        app = App()
+        app.save_path = json_path
+        app.add_habit("Example Habit1", "weekly")
+        app.add_habit("Exämple Habit2", "daily")
+        habit = app.habit_at_index(0)
+        if habit:
+            app.toggle_habit(habit)
+            habit.push_interval(1, 20)
+        app.save()
+
+        self.assertEqual(convert(App.open_store(json_path), App.open_store(save_path)), 2)
+        app2 = App.get_or_init(save_path, journal=True)
+        self.assertEqual(list(app2.filter.base.values()), list(app.filter.base.values()))
+
+        # histories are views into the save file until they are mutated
+        habit2 = app2.filter.base[list(app.filter.base)[0]]
+        self.assertTrue(habit2.history.is_view())
+        app2.toggle_habit(habit2)
+        self.assertFalse(habit2.history.is_view())
+        app2.save()
+        app2.close()
+
+        # round trip back to json
+        remove(json_path)
+        convert(App.open_store(save_path), App.open_store(json_path, journal=True))
+        self.assertFalse(path.exists(f"{json_path}.journal"))
+        app3 = App.get_or_init(json_path)
+        self.assertEqual(list(app3.filter.base.values()), list(app2.filter.base.values()))
+
+        remove(json_path)
+        remove(save_path)
+        remove(f"{save_path}.journal")
+
     
 if __name__ == "__main__":
     unittest.main()
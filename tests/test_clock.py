@@ -0,0 +1,99 @@
+import unittest
+from datetime import datetime, timedelta
+from classes.application import App
+from classes.binary_store import INTERVALS
+from classes.clock import CLOCK, RolloverScheduler, next_boundary
+from classes.habit import BaseHabit
+
+# Run instructions:
+# python -m unittest tests/test_clock.py
+
+"""
+This file includes tests for the clock service and the rollover scheduler.
+
+Tested?
+[x] next_boundary
+# RolloverScheduler
+[x] delay
+[x] due
+# App
+[x] rollover
+[x] due_habits
+"""
+
+
+class TestClock(unittest.TestCase):
+    def tearDown(self):
+        CLOCK.now = datetime.today
+
+    def test_next_boundary(self):
+        """
+        Tested methods:
+        1. next_boundary
+        """
+        # a sunday evening in december
+        now = datetime(2025, 12, 28, 23, 59, 30)
+        self.assertEqual(next_boundary("daily", now), datetime(2025, 12, 29))
+        self.assertEqual(next_boundary("weekly", now), datetime(2025, 12, 29))
+        self.assertEqual(next_boundary("monthly", now), datetime(2026, 1, 1))
+
+        # a monday at midnight already belongs to the new week
+        now = datetime(2025, 12, 29)
+        self.assertEqual(next_boundary("weekly", now), datetime(2026, 1, 5))
+        self.assertEqual(next_boundary("monthly", datetime(2024, 1, 31, 12)), datetime(2024, 2, 1))
+
+    def test_scheduler(self):
+        """
+        Tested methods:
+        1. RolloverScheduler.delay
+        2. RolloverScheduler.due
+        """
+        now = datetime(2025, 12, 30, 18)
+        scheduler = RolloverScheduler(now, INTERVALS)
+        self.assertEqual(scheduler.delay(now), 6 * 3600)
+        self.assertEqual(scheduler.due(now), [])
+
+        self.assertEqual(scheduler.due(datetime(2025, 12, 31, 0, 0, 1)), ["daily"])
+        self.assertEqual(scheduler.due(datetime(2025, 12, 31, 12)), [])
+        self.assertEqual(sorted(scheduler.due(datetime(2026, 1, 1, 0, 5))), ["daily", "monthly"])
+        self.assertEqual(scheduler.delay(datetime(2026, 1, 1, 23)), 3600)
+
+        # after a long sleep every interval is due once
+        self.assertEqual(sorted(scheduler.due(datetime(2026, 3, 1))), sorted(INTERVALS))
+        self.assertEqual(scheduler.delay(datetime(2026, 3, 1, 12)), 12 * 3600)
+
+    def test_rollover(self):
+        """
+        Tested methods:
+        1. App.due_habits
+        2. App.rollover
+        """
+        now = datetime(2025, 12, 30, 18)
+        CLOCK.now = lambda: now
+        app = App()
+
+        def check_rollover():
+            # what the rollover job of the UI does at every boundary
+            habits = app.due_habits(now)
+            app.rollover(habits, now)
+            return len(habits)
+
+        for interval in ("daily", "weekly", "monthly", "daily"):
+            app.filter.add(BaseHabit.create(f"Example Habit {interval}", interval))
+
+        self.assertEqual(check_rollover(), 0)
+        now += timedelta(hours=7)
+        # only the daily habits are checked
+        self.assertEqual(check_rollover(), 2)
+        for habit in app.filter.base.values():
+            self.assertEqual(habit.periods, 2 if habit.interval == "daily" else 1)
+        self.assertEqual(check_rollover(), 0)
+
+        now = datetime(2026, 1, 6, 12)
+        self.assertEqual(check_rollover(), 4)
+        for habit in app.filter.base.values():
+            self.assertEqual(habit.periods, {"daily": 8, "weekly": 2, "monthly": 2}[habit.interval])
+
+
+if __name__ == "__main__":
+    unittest.main()
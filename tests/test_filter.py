@@ -0,0 +1,148 @@
+import random
+import unittest
+from datetime import timedelta
+from classes.filter import LEADERBOARDS, SORT_KEYS, Filter
+from classes.habit import BaseHabit
+from classes.habit_store import HabitStore
+
+# Run instructions:
+# python -m unittest tests/test_filter.py
+
+"""
+This file includes tests for the Filter class.
+
+Tested?
+# Filter
+[x] populate
+[x] add
+[x] remove
+[x] lookup              # uid buckets
+[x] on_change
+[x] apply_filter
+[x] apply_sorting
+[x] top
+[x] leader
+"""
+
+
+def create_habits() -> dict[str, BaseHabit]:
+    habits = {}
+    for i, interval in enumerate(["daily", "weekly", "monthly", "daily"]):
+        habit = BaseHabit.create(f"Example Habit{i}", interval)
+        habits[habit.uid] = habit
+    return habits
+
+
+class TestFilter(unittest.TestCase):
+    def test_indexes(self):
+        """
+        Tested methods:
+        1. Filter.populate
+        2. Filter.apply_filter
+        3. Filter.on_change # through BaseHabit.toggle_completed
+        """
+        for habits in (create_habits(), HabitStore(create_habits())):
+            filter = Filter(habits)
+            filter.apply_filter("daily")
+            self.assertEqual([h.name for h in filter.tmp.values()], ["Example Habit0", "Example Habit3"])
+
+            filter.apply_filter("completed")
+            self.assertEqual(len(filter.tmp), 0)
+            habit = habits[list(habits)[1]]
+            habit.toggle_completed()
+            # the filtered habits follow the change without applying the filter again
+            self.assertEqual([h.name for h in filter.tmp.values()], ["Example Habit1"])
+            self.assertEqual(len(filter.lookup("completed", 0)), 3)
+            # the buckets only keep the uids, the habits are looked up in the base
+            self.assertEqual(list(filter.lookup("completed", 1).uids), [habit.uid])
+            self.assertEqual(filter.lookup("completed", 1)[habit.uid], habit)
+
+            habit.check_interval(habit.start.replace(year=habit.start.year + 1))
+            self.assertEqual(len(filter.tmp), 0)
+
+    def test_add_remove(self):
+        """
+        Tested methods:
+        1. Filter.add
+        2. Filter.remove
+        3. Filter.lookup
+        """
+        filter = Filter(create_habits())
+        habit = BaseHabit.create("Example Habit4", "monthly")
+        filter.add(habit)
+        filter.apply_filter("monthly")
+        self.assertEqual([h.name for h in filter.tmp.values()], ["Example Habit2", "Example Habit4"])
+
+        self.assertIs(filter.remove(habit.uid), habit)
+        self.assertIsNone(filter.remove(habit.uid))
+        self.assertEqual(len(filter.tmp), 1)
+        self.assertEqual(len(filter.base), 4)
+
+        # removed habits are not tracked anymore
+        habit.toggle_completed()
+        self.assertEqual(len(filter.lookup("completed", 1)), 0)
+
+    def test_sorting(self):
+        """
+        Tested methods:
+        1. Filter.apply_sorting
+        2. Filter.on_change # repositioning after toggles and rollovers
+        """
+        rng = random.Random(42)
+        habits = {}
+        for i in range(30):
+            habit = BaseHabit.create(f"Example Habit{rng.randint(0, 9)}", rng.choice(["daily", "weekly"]))
+            habits[habit.uid] = habit
+        filter = Filter(habits)
+
+        for step in range(200):
+            sorter = rng.choice(list(SORT_KEYS)) + rng.choice(["", "_desc"])
+            filter.apply_sorting(sorter)
+            filter.apply_filter(rng.choice(["all", "completed", "incomplete", "daily"]))
+            habit = habits[rng.choice(list(habits))]
+            if step % 10:
+                habit.toggle_completed()
+            else:
+                habit.check_interval(habit.start + timedelta(days=7))
+
+            key = SORT_KEYS[sorter.removesuffix("_desc")]
+            should_be = sorted(filter.tmp.source.values(), key=lambda h: (key(h), h.uid), reverse=sorter.endswith("_desc"))
+            self.assertEqual([h.uid for h in filter.tmp.values()], [h.uid for h in should_be])
+            for i, h in enumerate(should_be):
+                self.assertIs(filter.tmp.at(i), h)
+                self.assertEqual(filter.tmp.index_of(h.uid), i)
+
+    def test_leaderboards(self):
+        """
+        Tested methods:
+        1. Filter.top
+        2. Filter.leader
+        """
+        rng = random.Random(7)
+        habits = {}
+        for i in range(20):
+            habit = BaseHabit.create(f"Example Habit{i}", rng.choice(["daily", "weekly"]))
+            habits[habit.uid] = habit
+        filter = Filter(habits)
+        filter.apply_filter("daily")
+        # the leaderboards are built on first use
+        self.assertEqual(filter.leaderboards, {})
+
+        for step in range(150):
+            if step % 50 == 25:
+                filter.apply_filter("completed" if filter.filter == "daily" else "daily")
+            habit = habits[rng.choice(list(habits))]
+            if step % 4:
+                habit.toggle_completed()
+            else:
+                habit.check_interval(habit.start + timedelta(days=7))
+
+            for stat in LEADERBOARDS:
+                values = [getattr(h, stat) for h in filter.top(stat)]
+                self.assertEqual(values, sorted((getattr(h, stat) for h in habits.values()), reverse=True))
+                values = [getattr(h, stat) for h in filter.top(stat, filtered=True)]
+                self.assertEqual(values, sorted((getattr(h, stat) for h in filter.tmp.values()), reverse=True))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,13 @@
+import os
+import random
 import unittest
 from datetime import timedelta
-from classes.habit import BaseHabit, DailyHabit, MonthlyHabit, WeeklyHabit
+from classes.habit import CACHE_STATS, BaseHabit, DailyHabit, MonthlyHabit, WeeklyHabit
 from constants import TODAY
+from helpers.text import green, red
+
+GREEN = green("■")
+RED = red("■")
 
 # Run instructions:
 # python -m unittest tests/test_habit.py
@@ -12,8 +18,9 @@ This file includes tests for the BaseHabit class.
 
 Tested?
 # BaseHabit
-[x] reset (abstract, implemented in subclasses)  
-[x] check_interval (abstract, implemented in subclasses)
+[x] reset
+[x] check_interval
+[x] check_day           # see tests/test_periods.py
 
 [-] __init__            # not planned
 [x] create
@@ -21,11 +28,14 @@ Tested?
 [x] __eq__
 [-] inspect_self        # not planned
 [x] insert_missed
+[x] push_interval
 [x] toggle_completed
 [x] calculate_streaks
-[-] ui_history          # not planned
-[x] to_dict
+[x] ui_history          # incremental updates of the rendered strip
+[x] to_dict             # also without loading the history
 [x] from_dict
+[x] set_history_loader  # lazy from_dict
+[x] cached
 
 # DailyHabit
 
@@ -315,6 +325,37 @@ class TestHabit(unittest.TestCase):
         self.assertEqual(habit.current_streak, n % interrupt)
         self.assertEqual(habit.longest_negative, 1)
 
+    def test_incremental_streaks(self):
+        """
+        Tested methods:
+        1. BaseHabit.push_interval
+        2. BaseHabit.toggle_completed
+        3. BaseHabit.calculate_streaks
+
+        Differential test: the incrementally maintained streaks are compared to a
+        full scan after every operation on random histories.
+        Set STREAK_DIFF_ITERATIONS for a longer run.
+        """
+        iterations = int(os.environ.get("STREAK_DIFF_ITERATIONS", 200))
+        rng = random.Random(42)
+
+        def streaks(habit: BaseHabit) -> tuple[int, int, int, int]:
+            return (habit.current_streak, habit.current_negative, habit.longest_streak, habit.longest_negative)
+
+        for _ in range(iterations):
+            habit = BaseHabit.create("Test Habit", "daily")
+            for _ in range(rng.randint(1, 60)):
+                if rng.random() < 0.4:
+                    habit.toggle_completed()
+                else:
+                    habit.push_interval(rng.randint(0, 1), rng.randint(1, 5))
+                    habit.completed = habit.history[-1]
+
+                incremental = streaks(habit)
+                scanned = BaseHabit.from_dict(habit.to_dict(), check=False)
+                scanned.calculate_streaks()
+                self.assertEqual(incremental, streaks(scanned), habit.history)
+
     def test_str(self):
         """
         Tested methods:
@@ -341,6 +382,84 @@ class TestHabit(unittest.TestCase):
         deserialized = BaseHabit.from_dict(serialized)
         self.assertEqual(habit, deserialized)
 
+    def test_cache(self):
+        """
+        Tested methods:
+        1. BaseHabit.cached
+        2. BaseHabit.ui_history
+        3. BaseHabit.completion_rate
+        """
+        habit = BaseHabit.create("Test Habit", "daily")
+        habit.push_interval(1, 3)
+        hits, misses = CACHE_STATS.hits, CACHE_STATS.misses
+
+        strip = habit.ui_history()
+        self.assertEqual(habit.ui_history(), strip)
+        self.assertEqual(habit.completion_rate(), 0.75)
+        self.assertEqual((CACHE_STATS.hits - hits, CACHE_STATS.misses - misses), (1, 2))
+
+        # every mutation invalidates the cache
+        for mutate in (habit.toggle_completed, lambda: habit.check_interval(TODAY + timedelta(days=1)), habit.calculate_streaks):
+            generation = habit.generation
+            mutate()
+            self.assertGreater(habit.generation, generation)
+            self.assertEqual(habit.ui_history(), habit.history_strip("", 3).render())
+            self.assertEqual(habit.completion_rate(), habit.completions / habit.periods)
+
+    def test_history_strip(self):
+        """
+        Tested methods:
+        1. BaseHabit.ui_history # updated in place by push_interval and toggle_completed
+        """
+        rng = random.Random(3)
+        for interval in ("daily", "weekly", "monthly"):
+            habit = BaseHabit.create("Test Habit", interval)
+            for _ in range(100):
+                habit.ui_history(), habit.ui_history("  "), habit.ui_history(max_rows=1)
+                if rng.random() < 0.5:
+                    habit.toggle_completed()
+                else:
+                    habit.push_interval(rng.randint(0, 1), rng.choice([1, 2, 40]))
+                misses = CACHE_STATS.misses
+
+                cells = [GREEN if value else RED for value in reversed(habit.history.last(3 * habit.num_intervals))]
+                rows = ["".join(cells[i : i + habit.num_intervals]) for i in range(0, len(cells), habit.num_intervals)]
+                self.assertEqual(habit.ui_history(), "\n".join(rows))
+                self.assertEqual(habit.ui_history("  "), "\n  ".join(rows))
+                self.assertEqual(habit.ui_history(max_rows=1), rows[0])
+                # the strips were updated, not rendered again
+                self.assertEqual(CACHE_STATS.misses, misses)
+
+    def test_lazy_history(self):
+        """
+        Tested methods:
+        1. habit.from_dict # lazy
+        2. habit.set_history_loader # by extension
+        3. habit.insert_missed # without loading the history
+        4. habit.to_dict # without loading the history
+        """
+        habit = BaseHabit.create("Test Habit", "daily")
+        habit.toggle_completed()
+        habit.push_interval(1, 10)
+        habit.start = TODAY - timedelta(days=30)
+        serialized = habit.to_dict()
+
+        eager = BaseHabit.from_dict(serialized)
+        lazy = BaseHabit.from_dict(serialized, lazy=True)
+
+        # summary fields and the rollover are available without the history
+        self.assertFalse(lazy.is_loaded())
+        self.assertEqual((lazy.periods, lazy.completions), (eager.periods, eager.completions))
+        self.assertEqual(lazy.current_negative, eager.current_negative)
+        self.assertEqual(lazy.longest_streak, eager.longest_streak)
+        # saving writes the persisted history back, including the missed intervals
+        self.assertEqual(lazy.to_dict(), eager.to_dict())
+        self.assertFalse(lazy.is_loaded())
+
+        self.assertEqual(lazy.history, eager.history)
+        self.assertTrue(lazy.is_loaded())
+        self.assertEqual(lazy, eager)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,151 @@
+import unittest
+from collections.abc import Iterator
+from datetime import timedelta
+from classes.habit import BaseHabit
+from classes.habit_store import HabitStore
+from constants import TODAY
+
+# Run instructions:
+# python -m unittest tests/test_habit_store.py
+
+"""
+This file includes tests for the HabitStore class and its HabitView objects.
+
+Tested?
+# HabitStore
+[x] __setitem__
+[x] __getitem__
+[x] __delitem__
+[x] compact
+[x] values              # iterators, no list of views
+[x] items
+# HabitView
+[x] toggle_completed
+[x] check_interval
+[x] to_dict
+[x] ui_history
+[x] invalidate          # per row generations
+# RowHistory
+[x] bits                # views into the arena
+"""
+
+
+class TestHabitStore(unittest.TestCase):
+    def test_views(self):
+        """
+        Tested methods:
+        1. HabitStore.__setitem__
+        2. HabitView.toggle_completed
+        3. HabitView.check_interval
+        4. HabitView.to_dict
+        """
+        habits = {}
+        for i, interval in enumerate(["daily", "weekly", "monthly"] * 3):
+            habit = BaseHabit.create(f"Exämple Habit{i}", interval)
+            habits[habit.uid] = habit
+        store = HabitStore(habits)
+
+        # the views have to behave exactly like the habits they were created from
+        for day in range(1, 200, 3):
+            today = TODAY + timedelta(days=day)
+            for i, (uid, habit) in enumerate(habits.items()):
+                view = store[uid]
+                for _ in range((day + i) % 3):
+                    habit.toggle_completed()
+                    view.toggle_completed()
+                habit.check_interval(today)
+                view.check_interval(today)
+                self.assertEqual(view, habit)
+                self.assertEqual(view.to_dict(), habit.to_dict())
+
+        self.assertEqual(list(store), list(habits))
+        self.assertIsInstance(store[list(habits)[0]], BaseHabit)
+
+    def test_remove(self):
+        """
+        Tested methods:
+        1. HabitStore.__delitem__
+        2. HabitStore.compact
+        """
+        habits = {}
+        for i in range(10):
+            habit = BaseHabit.create(f"Example Habit{i}", "daily")
+            habit.push_interval(1, i * 10)
+            habits[habit.uid] = habit
+        store = HabitStore(habits)
+
+        removed = list(habits)[:4]
+        for uid in removed:
+            del store[uid]
+        self.assertEqual(len(store), 6)
+        self.assertNotIn(removed[0], store)
+        with self.assertRaises(KeyError):
+            store[removed[0]]
+
+        # removed rows are reused
+        store[removed[0]] = habits[removed[0]]
+        self.assertEqual(len(store.free), 3)
+
+        store.compact()
+        self.assertEqual(store.garbage, 0)
+        for uid, view in store.items():
+            self.assertEqual(view, habits[uid])
+
+    def test_memory(self):
+        """
+        Tested methods:
+        1. HabitStore.values
+        2. HabitStore.items
+        3. RowHistory.bits
+        """
+        habits = {}
+        for i in range(3):
+            habit = BaseHabit.create(f"Example Habit{i}", "daily")
+            habit.push_interval(1, 20)
+            habits[habit.uid] = habit
+        store = HabitStore(habits)
+
+        self.assertIsInstance(store.values(), Iterator)
+        self.assertIsInstance(store.items(), Iterator)
+        self.assertEqual(dict(store.items()), habits)
+
+        # the bits are read from the arena without copying them
+        view = store[list(habits)[0]]
+        bits = view.history.bits
+        self.assertIsInstance(bits, memoryview)
+        self.assertEqual(bits, habits[view.uid].history.bits)
+        view.history[1] = 0
+        self.assertEqual(bits[0] >> 1 & 1, 0)
+        bits.release()
+        # the arena can grow again once the view is released
+        view.push_interval(1, 100)
+        self.assertEqual(view.history.count(), 119)
+
+    def test_ui_history(self):
+        """
+        Tested methods:
+        1. HabitView.ui_history
+        2. HabitView.invalidate
+        """
+        habits = {}
+        for interval in ("daily", "weekly", "monthly"):
+            habit = BaseHabit.create(f"Example Habit {interval}", interval)
+            habit.push_interval(1, 12)
+            habit.push_interval(0)
+            habits[habit.uid] = habit
+        store = HabitStore(habits)
+        changes = []
+        store.observer = lambda habit, name, old: changes.append((habit.uid, name, old))
+
+        for uid, habit in habits.items():
+            view = store[uid]
+            self.assertEqual(view.ui_history("  ", 2), habit.ui_history("  ", 2))
+            view.toggle_completed()
+            habit.toggle_completed()
+            self.assertEqual(view.generation, 1)
+            self.assertEqual(store[uid].ui_history(), habit.ui_history())
+        self.assertIn((list(habits)[0], "generation", 0), changes)
+
+
+if __name__ == "__main__":
+    unittest.main()
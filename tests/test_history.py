@@ -0,0 +1,149 @@
+import random
+import unittest
+from classes.history import History
+
+# Run instructions:
+# python -m unittest tests/test_history.py
+
+"""
+This file includes tests for the History class.
+
+Tested?
+# History
+[x] append
+[x] extend
+[x] set_last
+[x] last
+[x] count
+[x] __eq__
+[x] to_base64
+[x] from_base64
+[x] extend_base64
+[x] view
+[x] window
+[x] best_window
+"""
+
+
+class TestHistory(unittest.TestCase):
+    def test_append(self):
+        """
+        Tested methods:
+        1. History.append
+        2. History.set_last
+        3. History.__eq__
+        """
+        values = [1, 0, 1, 1, 0, 0, 0, 1, 1, 0, 1]
+        history = History()
+        for value in values:
+            history.append(value)
+
+        self.assertEqual(len(history), len(values))
+        self.assertEqual(history, values)
+        self.assertEqual(len(history.bits), 2)
+
+        history.set_last(0)
+        self.assertEqual(history[-1], 0)
+        history.set_last(1)
+        self.assertEqual(history, values)
+
+    def test_extend(self):
+        """
+        Tested methods:
+        1. History.extend
+        """
+        for start in range(0, 10):
+            for count in range(0, 30):
+                for value in (0, 1):
+                    values = [1, 0, 1, 1, 0, 1, 0, 0, 1, 1][:start]
+                    history = History(values)
+                    history.extend(value, count)
+                    self.assertEqual(history, values + [value] * count)
+                    self.assertEqual(history.count(), sum(values) + value * count)
+                    self.assertEqual(len(history.bits), (start + count + 7) // 8)
+
+    def test_last(self):
+        """
+        Tested methods:
+        1. History.last
+        2. History.count
+        """
+        values = [i % 3 == 0 for i in range(50)]
+        history = History(int(v) for v in values)
+
+        self.assertEqual(history.last(10), [int(v) for v in values[-10:]])
+        self.assertEqual(history.last(100), [int(v) for v in values])
+        self.assertEqual(history.count(), sum(values))
+
+    def test_serialization(self):
+        """
+        Tested methods:
+        1. History.to_base64
+        2. History.from_base64
+        3. History.extend_base64
+        """
+        history = History([1, 1, 0, 1, 0, 0, 1, 1, 1])
+        deserialized = History.from_base64(history.to_base64(), len(history))
+        self.assertEqual(history, deserialized)
+
+        with self.assertRaises(ValueError):
+            History.from_base64(history.to_base64(), 100)
+
+        # appending zeros to the encoded history matches appending them to the history
+        for count in (0, 3, 7, 8, 30):
+            extended = History.from_base64(History.extend_base64(history.to_base64(), len(history), count), len(history) + count)
+            self.assertEqual(extended, History(list(history) + [0] * count))
+
+    def test_view(self):
+        """
+        Tested methods:
+        1. History.view
+        2. History.append # copy on write
+        """
+        values = [1, 0, 1, 1, 0, 0, 1, 1, 1, 0]
+        buffer = bytes(History(values).bits)
+        history = History.view(memoryview(buffer), len(values))
+
+        self.assertTrue(history.is_view())
+        self.assertEqual(history, values)
+        self.assertEqual(history.count(), sum(values))
+
+        history.append(1)
+        self.assertFalse(history.is_view())
+        self.assertEqual(history, values + [1])
+        self.assertEqual(History.view(memoryview(buffer), len(values)), values)
+
+    def test_window(self):
+        """
+        Tested methods:
+        1. History.window
+        2. History.best_window
+        3. History.count_range
+        """
+        rng = random.Random(42)
+        values = []
+        history = History()
+        for _ in range(300):
+            if values and rng.random() < 0.3:
+                values[-1] = rng.randint(0, 1)
+                history.set_last(values[-1])
+            else:
+                value, count = rng.randint(0, 1), rng.randint(1, 10)
+                values += [value] * count
+                history.extend(value, count)
+
+            for size in (1, 7, 30):
+                best = max(sum(values[max(end - size, 0):end]) for end in range(min(size, len(values)), len(values) + 1))
+                self.assertEqual(history.window(size), sum(values[-size:]))
+                self.assertEqual(history.best_window(size), best)
+
+        self.assertEqual(history.count_range(10, 50), sum(values[10:50]))
+        # changing an older interval drops the cached best windows
+        history[0] = 1 - history[0]
+        values[0] = 1 - values[0]
+        self.assertEqual(history.best_window(1), max(values))
+        self.assertEqual(history.count_range(0, 8), sum(values[:8]))
+
+
+if __name__ == "__main__":
+    unittest.main()
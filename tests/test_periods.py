@@ -0,0 +1,152 @@
+import unittest
+from datetime import date, datetime, timedelta
+from unittest import mock
+from classes import periods
+from classes.habit import BaseHabit
+from classes.periods import (
+    civil_from_days,
+    date_fields,
+    days_from_civil,
+    format_day,
+    from_epoch_day,
+    parse_day,
+    period_index,
+    period_start,
+    to_epoch_day,
+)
+from classes.storage import apply_record
+from constants import DATEFORMAT
+
+# Run instructions:
+# python -m unittest tests/test_periods.py
+
+"""
+This file includes tests for the epoch day period arithmetic.
+
+Tested?
+[x] to_epoch_day
+[x] from_epoch_day
+[x] days_from_civil
+[x] civil_from_days
+[x] period_index
+[x] period_start
+[x] date_fields
+[x] parse_day
+[x] format_day
+# BaseHabit
+[x] check_day
+[x] from_dict           # legacy DATEFORMAT starts
+# storage
+[x] apply_record        # legacy DATEFORMAT periods
+"""
+
+
+class TestPeriods(unittest.TestCase):
+    def test_civil(self):
+        """
+        Tested methods:
+        1. to_epoch_day
+        2. from_epoch_day
+        3. days_from_civil
+        4. civil_from_days
+        5. format_day
+        6. parse_day
+        """
+        self.assertEqual(to_epoch_day(datetime(1970, 1, 1, 23, 59)), 0)
+        self.assertEqual(from_epoch_day(-1), datetime(1969, 12, 31))
+        # every day of a few leap and century years
+        day = date(1899, 12, 1)
+        while day < date(2101, 3, 1):
+            epoch_day = to_epoch_day(day)
+            self.assertEqual(days_from_civil(day.year, day.month, day.day), epoch_day)
+            self.assertEqual(civil_from_days(epoch_day), (day.year, day.month, day.day))
+            self.assertEqual(format_day(epoch_day), day.strftime(DATEFORMAT))
+            self.assertEqual(parse_day(format_day(epoch_day)), epoch_day)
+            day += timedelta(days=1 if day.year in (1899, 1900, 2000, 2024, 2100) else 97)
+        self.assertEqual(parse_day(20000), 20000)
+
+    def test_date_fields(self):
+        """
+        Tested methods:
+        1. date_fields
+        2. parse_day # other formats
+        3. format_day # other formats
+        """
+        self.assertEqual(date_fields("%d-%m-%Y"), ("-", ("d", "m", "Y")))
+        self.assertEqual(date_fields("%Y.%m.%d"), (".", ("Y", "m", "d")))
+        self.assertIsNone(date_fields("%d %b %Y"))
+        self.assertIsNone(date_fields("%Y%m%d"))
+
+        day = to_epoch_day(datetime(2024, 2, 29))
+        for dateformat in ("%Y/%m/%d", "%d %b %Y"):
+            with mock.patch.object(periods, "DATEFORMAT", dateformat), \
+                    mock.patch.object(periods, "DATE_FIELDS", date_fields(dateformat)):
+                self.assertEqual(format_day(day), datetime(2024, 2, 29).strftime(dateformat))
+                self.assertEqual(parse_day(format_day(day)), day)
+
+    def test_period_index(self):
+        """
+        Tested methods:
+        1. period_index
+        2. period_start
+        """
+        # wednesday, 31st of december 2025
+        day = to_epoch_day(datetime(2025, 12, 31))
+        for interval in ("daily", "weekly", "monthly"):
+            index = period_index(interval, day)
+            self.assertLessEqual(period_start(interval, index), day)
+            self.assertEqual(period_index(interval, period_start(interval, index)), index)
+            self.assertEqual(period_index(interval, period_start(interval, index + 1)), index + 1)
+
+        self.assertEqual(from_epoch_day(period_start("weekly", period_index("weekly", day))), datetime(2025, 12, 29))
+        self.assertEqual(from_epoch_day(period_start("monthly", period_index("monthly", day))), datetime(2025, 12, 1))
+        # the missed periods are the difference of the indexes
+        later = to_epoch_day(datetime(2026, 3, 2))
+        self.assertEqual(period_index("daily", later) - period_index("daily", day), 61)
+        self.assertEqual(period_index("weekly", later) - period_index("weekly", day), 9)
+        self.assertEqual(period_index("monthly", later) - period_index("monthly", day), 3)
+        # days before the epoch
+        self.assertEqual(from_epoch_day(period_start("weekly", period_index("weekly", -1))), datetime(1969, 12, 29))
+
+    def test_check_day(self):
+        """
+        Tested methods:
+        1. BaseHabit.check_day
+        """
+        start = to_epoch_day(datetime(2025, 12, 31))
+        for interval, missed in (("daily", 61), ("weekly", 9), ("monthly", 3)):
+            habit = BaseHabit.create("Test Habit", interval)
+            habit.reset_day(start)
+            length = habit.periods
+            habit.check_day(start)
+            self.assertEqual(habit.periods, length)
+
+            habit.check_day(to_epoch_day(datetime(2026, 3, 2, 23)))
+            self.assertEqual(habit.periods, length + missed)
+            self.assertEqual(habit.current_negative, length + missed)
+            self.assertEqual(habit.start.weekday() if interval == "weekly" else 0, 0)
+
+    def test_legacy_dates(self):
+        """
+        Tested methods:
+        1. BaseHabit.from_dict # DATEFORMAT starts
+        2. apply_record # DATEFORMAT periods
+        """
+        habit = BaseHabit.create("Test Habit", "weekly")
+        habit.start = datetime(2025, 12, 29)
+        data = habit.to_dict()
+        self.assertEqual(data["start"], to_epoch_day(datetime(2025, 12, 29)))
+
+        data["start"] = datetime(2025, 12, 29).strftime(DATEFORMAT)
+        legacy = BaseHabit.from_dict(data, check=False)
+        self.assertEqual(legacy, habit)
+
+        habits = {legacy.uid: legacy}
+        apply_record(habits, {"op": "toggle", "uid": legacy.uid, "period": datetime(2026, 1, 5).strftime(DATEFORMAT), "completed": 1})
+        self.assertEqual(legacy.start, datetime(2026, 1, 5))
+        self.assertEqual(legacy.periods, habit.periods + 1)
+        self.assertEqual(legacy.completed, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
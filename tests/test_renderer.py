@@ -0,0 +1,155 @@
+import asyncio
+import io
+import re
+import unittest
+from classes.application import App
+from classes.habit import BaseHabit
+from ui.classes.frames import FrameScheduler
+from ui.classes.renderer import CLEAR_BELOW, SCREEN, Renderer
+from ui.classes.viewport import Viewport
+from ui.ui import UiHelpers
+
+# Run instructions:
+# python -m unittest tests/test_renderer.py
+
+"""
+This file includes tests for the differential screen renderer.
+
+Tested?
+# Renderer
+[x] diff
+[x] draw
+[x] invalidate
+# Viewport
+[x] window
+# FrameScheduler
+[x] request
+[x] cancel
+# UiHelpers
+[x] draw_list           # only the written rows, not the looks
+"""
+
+
+def written_rows(output: str) -> list[int]:
+    return [int(row) for row in re.findall(r"\033\[(\d+);1H", output)]
+
+
+class TestRenderer(unittest.TestCase):
+    def test_diff(self):
+        """
+        Tested methods:
+        1. Renderer.diff
+        2. Renderer.draw
+        3. Renderer.invalidate
+        """
+        stream = io.StringIO()
+        renderer = Renderer(stream)
+        renderer.draw(["a", "b", "c"])
+        self.assertTrue(stream.getvalue().endswith("a\nb\nc"))
+
+        self.assertEqual(renderer.diff(["a", "b", "c"]), "")
+        self.assertEqual(written_rows(renderer.diff(["a", "x", "c", "d"])), [2, 4])
+        output = renderer.diff(["a"])
+        self.assertEqual(written_rows(output), [2])
+        self.assertIn(CLEAR_BELOW, output)
+
+        # nothing is written if the frame did not change
+        renderer.draw(["a", "b", "c"])
+        before = stream.getvalue()
+        renderer.draw(["a", "b", "c"])
+        self.assertEqual(stream.getvalue(), before)
+
+        renderer.invalidate()
+        self.assertTrue(renderer.diff(["a"]).endswith("a"))
+        self.assertEqual(written_rows(renderer.diff(["a"])), [])
+
+    def test_draw_list(self):
+        """
+        Tested methods:
+        1. UiHelpers.draw_list
+        """
+        app = App()
+        for i in range(10):
+            app.filter.add(BaseHabit.create(f"Example Habit{i}", "daily"))
+
+        stream = io.StringIO()
+        SCREEN.stream = stream
+        SCREEN.invalidate()
+        UiHelpers.viewport.rows = 40
+        try:
+            UiHelpers.draw_list(app, 0)
+            stream.seek(0)
+            stream.truncate()
+            UiHelpers.draw_list(app, 1)
+        finally:
+            SCREEN.stream = None
+            SCREEN.invalidate()
+
+        # the two list rows (below the header) and the name of the inspected habit
+        self.assertEqual(written_rows(stream.getvalue()), [3, 4, 14])
+
+    def test_viewport(self):
+        """
+        Tested methods:
+        1. Viewport.window
+        """
+        viewport = Viewport()
+        viewport.rows = 15
+        self.assertEqual(viewport.window(0, 1000, 5), range(0, 10))
+        self.assertEqual(viewport.window(9, 1000, 5), range(0, 10))
+        # the window follows the selection in both directions
+        self.assertEqual(viewport.window(10, 1000, 5), range(1, 11))
+        self.assertEqual(viewport.window(500, 1000, 5), range(491, 501))
+        self.assertEqual(viewport.window(495, 1000, 5), range(491, 501))
+        self.assertEqual(viewport.window(490, 1000, 5), range(490, 500))
+        self.assertEqual(viewport.window(999, 1000, 5), range(990, 1000))
+        # lists that fit are not scrolled
+        self.assertEqual(viewport.window(3, 4, 5), range(0, 4))
+        self.assertEqual(viewport.height, 10)
+
+        viewport.rows = 3
+        self.assertEqual(viewport.window(0, 1000, 5), range(0, 1))
+
+    def test_frames(self):
+        """
+        Tested methods:
+        1. FrameScheduler.request
+        2. FrameScheduler.cancel
+        """
+        drawn = []
+        frames = FrameScheduler(lambda: drawn.append(len(drawn)), rate=20)
+
+        # without an event loop every request is drawn
+        frames.request()
+        frames.request()
+        self.assertEqual(frames.frames, 2)
+
+        async def burst():
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            # 50 requests within a quarter second are drawn at most 20 times per second
+            while loop.time() - start < 0.25:
+                frames.request()
+                await asyncio.sleep(0.005)
+            await asyncio.sleep(0.1)
+
+        frames.frames = 0
+        asyncio.run(burst())
+        self.assertGreaterEqual(frames.frames, 2)
+        self.assertLessEqual(frames.frames, 7)
+
+        async def cancel_and_request():
+            frames.request()
+            frames.cancel()
+            # a cancelled frame does not block the next request
+            frames.request()
+            await asyncio.sleep(0.1)
+
+        frames.frames = 0
+        frames.last = float("-inf")
+        asyncio.run(cancel_and_request())
+        self.assertEqual(frames.frames, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import random
+import unittest
+from classes import streaks
+from classes.filter import Filter
+from classes.habit import BaseHabit
+from classes.history import History
+from classes.streaks import Streaks, compute_streaks, recalculate_streaks
+
+# Run instructions:
+# python -m unittest tests/test_streaks.py
+
+"""
+This file includes tests for the batch streak computation.
+
+Tested?
+[x] compute_streaks     # numpy is only tested if it is installed
+[x] recalculate_streaks
+"""
+
+
+def scan(history: History) -> Streaks:
+    habit = BaseHabit.create("Test Habit", "daily")
+    habit.history = history
+    habit.calculate_streaks()
+    return Streaks(
+        habit.current_streak,
+        habit.longest_streak,
+        habit.current_negative,
+        habit.longest_negative,
+        habit.closed_streak,
+        habit.closed_negative,
+        habit.previous_run,
+    )
+
+
+class TestStreaks(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(42)
+        self.histories = [History(), History([0]), History([1])]
+        for _ in range(300):
+            rate = rng.random()
+            length = rng.choice([7, 8, 9, rng.randint(0, 300)])
+            self.histories.append(History(int(rng.random() < rate) for _ in range(length)))
+
+    def test_python(self):
+        """
+        Tested methods:
+        1. compute_streaks # pure python
+        """
+        self.assertEqual(compute_streaks(self.histories, vectorized=False), [scan(h) for h in self.histories])
+
+    @unittest.skipIf(streaks.np is None, "numpy is not installed")
+    def test_numpy(self):
+        """
+        Tested methods:
+        1. compute_streaks # numpy
+        """
+        self.assertEqual(compute_streaks(self.histories), [scan(h) for h in self.histories])
+        self.assertEqual(compute_streaks([History(), History()]), [Streaks(0, 0, 0, 0, 0, 0, 0)] * 2)
+
+    def test_recalculate(self):
+        """
+        Tested methods:
+        1. recalculate_streaks
+        """
+        habits = []
+        for history in self.histories[:50]:
+            habit = BaseHabit.create("Test Habit", "weekly")
+            habit.history = history
+            habits.append(habit)
+        recalculate_streaks(habits)
+
+        for habit in habits:
+            scanned = BaseHabit.from_dict(habit.to_dict(), check=False)
+            scanned.calculate_streaks()
+            self.assertEqual(habit.to_dict(), scanned.to_dict())
+
+    def test_recalculate_invalidates(self):
+        """
+        Tested methods:
+        1. recalculate_streaks # cached values and leaderboards of live habits
+        """
+        habits = {}
+        for history in self.histories[:20]:
+            habit = BaseHabit.create("Test Habit", "daily")
+            habit.history = history
+            # e.g. streaks missing from an old save file
+            habit.longest_streak = 0
+            habits[habit.uid] = habit
+        filter = Filter(habits)
+        self.assertEqual([h.longest_streak for h in filter.top("longest_streak")], [0] * 20)
+        for habit in habits.values():
+            self.assertEqual(habit.cached("longest", lambda: habit.longest_streak), 0)
+
+        recalculate_streaks(habits.values())
+        values = [h.longest_streak for h in filter.top("longest_streak")]
+        self.assertEqual(values, sorted((scan(h.history).longest_streak for h in habits.values()), reverse=True))
+        for habit in habits.values():
+            self.assertEqual(habit.cached("longest", lambda: habit.longest_streak), habit.longest_streak)
+
+
+if __name__ == "__main__":
+    unittest.main()
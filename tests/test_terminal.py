@@ -0,0 +1,57 @@
+import unittest
+from ui.classes.terminal import KeyParser
+
+# Run instructions:
+# python -m unittest tests/test_terminal.py
+
+"""
+This file includes tests for the terminal input tokenizer.
+
+Tested?
+# KeyParser
+[x] feed
+[x] flush
+# TerminalSession
+[-] read_events         # needs a terminal, not planned
+"""
+
+
+class TestKeyParser(unittest.TestCase):
+    def test_typeahead(self):
+        """
+        Tested methods:
+        1. KeyParser.feed
+        """
+        parser = KeyParser()
+        # every key is an event of its own, even if they arrived at once
+        self.assertEqual(parser.feed("jjj"), ["DOWN", "DOWN", "DOWN"])
+        self.assertEqual(parser.feed("\x1b[A\x1b[Bk\x1b[6~G"), ["UP", "DOWN", "UP", "PAGE_DOWN", "BOTTOM"])
+        self.assertEqual(parser.feed("Habit ä\r"), ["H", "a", "b", "i", "t", " ", "ä", "RETURN"])
+        # unknown sequences are returned as a single event
+        self.assertEqual(parser.feed("\x1b[1;5C"), ["\x1b[1;5C"])
+        self.assertEqual(parser.pending, "")
+
+    def test_split_sequences(self):
+        """
+        Tested methods:
+        1. KeyParser.feed # sequences split across reads
+        2. KeyParser.flush
+        """
+        parser = KeyParser()
+        self.assertEqual(parser.feed("j\x1b"), ["DOWN"])
+        self.assertEqual(parser.feed("["), [])
+        self.assertEqual(parser.feed("5"), [])
+        self.assertEqual(parser.feed("~q"), ["PAGE_UP", "QUIT"])
+
+        # a lone escape is the escape key once nothing follows it
+        self.assertEqual(parser.feed("\x1b"), [])
+        self.assertEqual(parser.flush(), ["ESCAPE"])
+        self.assertEqual(parser.flush(), [])
+        self.assertEqual(parser.feed("\x1b\x1b"), ["ESCAPE"])
+        self.assertEqual(parser.flush(), ["ESCAPE"])
+        self.assertEqual(parser.feed("\x1bO"), [])
+        self.assertEqual(parser.flush(), ["ESCAPE", "O"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+import asyncio
+import io
+import os
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+from classes.application import App
+from classes.habit import BaseHabit
+from classes.history import History
+from ui.classes.renderer import SCREEN
+from ui.classes.terminal import TerminalSession
+from ui.ui import UI, UiHelpers
+
+# Run instructions:
+# python -m unittest tests/test_ui.py
+
+"""
+This file includes tests for the event loop of the UI. The input is read from a pipe.
+
+Tested?
+# UI
+[x] run
+[x] spawn
+[x] on_job_done
+[x] on_input
+[x] handle_events       # coalesced navigation, toggles behind other screens
+[x] navigate
+[x] warm_stats          # also while habits are removed
+[-] main_loop           # needs a terminal, not planned
+[-] eval_action         # ui effects, not planned
+"""
+
+
+class TestUI(unittest.TestCase):
+    def setUp(self):
+        self.read_fd, self.write_fd = os.pipe()
+        self.app = App()
+        for i in range(100):
+            habit = BaseHabit.create(f"Example Habit{i:03}", "daily")
+            habit.set_history_loader(lambda: History([1, 0, 1]), 3, 2)
+            self.app.filter.add(habit)
+        SCREEN.stream = io.StringIO()
+        SCREEN.invalidate()
+        UiHelpers.viewport.rows = 60
+        UiHelpers.viewport.offset = 0
+        self.ui = UI(self.app, session=TerminalSession(self.read_fd))
+
+    def tearDown(self):
+        os.close(self.read_fd)
+        os.close(self.write_fd)
+        SCREEN.stream = None
+        SCREEN.invalidate()
+
+    def test_coalesced_navigation(self):
+        """
+        Tested methods:
+        1. UI.handle_events
+        2. UI.navigate
+        """
+        page = UiHelpers.viewport.height
+
+        async def burst():
+            drawn = self.ui.frames.frames
+            self.assertFalse(self.ui.handle_events(["DOWN"] * 5 + ["PAGE_DOWN", "UP"]))
+            # nothing is drawn until the frame is due
+            self.assertEqual(self.ui.frames.frames, drawn)
+            self.assertIsNotNone(self.ui.frames.handle)
+            await asyncio.sleep(0.1)
+            return self.ui.frames.frames - drawn
+
+        self.assertEqual(asyncio.run(burst()), 1)
+        self.assertEqual(self.ui.index, 5 + page - 1)
+        self.assertIn("Example Habit0", SCREEN.stream.getvalue())
+
+    def test_toggle_after_help(self):
+        """
+        Tested methods:
+        1. UI.handle_events # a toggle redraws the list behind the help
+        """
+        self.app.save_path = "tests.ui.json.tmp"
+
+        async def help_then_toggle():
+            with mock.patch("ui.ui.os.system"), redirect_stdout(io.StringIO()):
+                self.ui.handle_events(["DOWN", "h"])
+            self.assertIsNone(SCREEN.frame)
+            drawn = self.ui.frames.frames
+            self.ui.handle_events(["c"])
+            await asyncio.sleep(0.1)
+            return self.ui.frames.frames - drawn
+
+        try:
+            self.assertEqual(asyncio.run(help_then_toggle()), 1)
+        finally:
+            os.remove(self.app.save_path)
+        self.assertIsNotNone(SCREEN.frame)
+        self.assertEqual(self.app.habit_at_index(1).completed, 1)
+
+    def test_run(self):
+        """
+        Tested methods:
+        1. UI.run
+        2. UI.on_input
+        3. UI.warm_stats
+        """
+        os.write(self.write_fd, b"jj\x1b[Bq")
+        with mock.patch.object(UiHelpers, "clear_term"):
+            asyncio.run(self.ui.run())
+
+        self.assertEqual(self.ui.index, 3)
+        self.assertEqual(self.ui.tasks, set())
+        # only the statistics of the first pages are computed ahead of time
+        loaded = [habit.is_loaded() for habit in self.app.filter.tmp.values()]
+        self.assertTrue(all(loaded[: 2 * UiHelpers.viewport.height]))
+        self.assertFalse(any(loaded[2 * UiHelpers.viewport.height :]))
+
+    def test_warm_stats_removal(self):
+        """
+        Tested methods:
+        1. UI.warm_stats # habits removed while the job yields
+        """
+        async def warm_while_removing():
+            with mock.patch("ui.ui.CHUNK_SIZE", 2):
+                task = asyncio.create_task(self.ui.warm_stats())
+                await asyncio.sleep(0)
+                for uid in list(self.app.filter.base)[:99]:
+                    self.app.filter.remove(uid)
+                await task
+
+        asyncio.run(warm_while_removing())
+        self.assertEqual(len(self.app.filter.tmp), 1)
+
+    def test_failing_job(self):
+        """
+        Tested methods:
+        1. UI.spawn
+        2. UI.on_job_done
+        """
+        async def fail():
+            raise RuntimeError("job failed")
+
+        self.ui.warm_stats = fail
+        with self.assertRaises(RuntimeError):
+            asyncio.run(self.ui.run())
+
+
+if __name__ == "__main__":
+    unittest.main()
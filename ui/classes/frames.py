@@ -0,0 +1,55 @@
+import asyncio
+import time
+from typing import Callable, Optional
+
+
+class FrameScheduler:
+    """
+    Coalesces redraw requests into frames. Requests made while a frame is pending are
+    dropped, and frames are at least 1 / `rate` seconds apart, so a burst of input is
+    drawn at most `rate` times per second. Outside of a running event loop every
+    request is drawn immediately.
+    """
+    draw: Callable[[], None]
+    interval: float  # minimum time between two frames in seconds
+    last: float  # time.monotonic() of the last frame
+    handle: Optional[asyncio.TimerHandle]
+    frames: int  # number of drawn frames
+
+    def __init__(self, draw: Callable[[], None], rate: int = 30) -> None:
+        self.draw = draw
+        self.interval = 1 / rate
+        self.last = float("-inf")
+        self.handle = None
+        self.frames = 0
+
+    def request(self) -> None:
+        """
+        This method schedules a frame, unless one is pending already
+
+        Args:
+            self (FrameScheduler)
+
+        Returns:
+            None
+        """
+        if self.handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._draw()
+            return
+        delay = max(0.0, self.last + self.interval - time.monotonic())
+        self.handle = loop.call_later(delay, self._draw)
+
+    def cancel(self) -> None:
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+
+    def _draw(self) -> None:
+        self.handle = None
+        self.last = time.monotonic()
+        self.frames += 1
+        self.draw()
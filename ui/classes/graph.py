@@ -14,12 +14,13 @@ class Graph:
         self.draw()
 
     def draw(self) -> None:
-        habits = self.habits.values()
+        # iterated twice, containers like the HabitStore yield their habits only once
+        habits = list(self.habits.values())
         # Header
         print(f"{bold_underline('Habit Completions')}", end="\n\n")
 
         # Get maximum and minimum number of completions
-        completion_counts = [sum(item.history) for item in habits]
+        completion_counts = [item.completions for item in habits]
         max_compl = max(completion_counts)
         maximum = min(max_compl, self.max_items)
         minimum = min(completion_counts)
@@ -0,0 +1,83 @@
+import sys
+from typing import Optional, TextIO
+
+from constants import CLEAR_SCREEN, CURSOR_HOME, HIDE_CURSOR
+
+CLEAR_LINE = "\033[K"
+CLEAR_BELOW = "\033[J"
+
+
+def cursor_to(row: int) -> str:
+    # rows start at 1 on the terminal
+    return f"\033[{row};1H"
+
+
+class Renderer:
+    """
+    Double buffered screen renderer. Every frame is a list of lines, only the lines that
+    differ from the previous frame are written, in a single write to the stream.
+    Everything that writes to the screen without the renderer has to call invalidate.
+    """
+    stream: Optional[TextIO]
+    frame: Optional[list[str]]  # the frame that is currently on the screen, None if unknown
+
+    def __init__(self, stream: Optional[TextIO] = None) -> None:
+        self.stream = stream
+        self.frame = None
+
+    def invalidate(self) -> None:
+        """
+        This method forces the next frame to be drawn on a cleared screen
+
+        Args:
+            self (Renderer)
+
+        Returns:
+            None
+        """
+        self.frame = None
+
+    def diff(self, lines: list[str]) -> str:
+        """
+        This method returns the output that turns the current screen into the given frame
+
+        Args:
+            self (Renderer)
+            lines (list[str]): The lines of the new frame, without line breaks
+
+        Returns:
+            output (str): The changed lines with their cursor positioning escapes
+        """
+        if self.frame is None:
+            return HIDE_CURSOR + CLEAR_SCREEN + CURSOR_HOME + "\n".join(lines)
+
+        previous = self.frame
+        output = []
+        for row, line in enumerate(lines):
+            if row >= len(previous) or previous[row] != line:
+                output.append(f"{cursor_to(row + 1)}{line}{CLEAR_LINE}")
+        if len(lines) < len(previous):
+            output.append(cursor_to(len(lines) + 1) + CLEAR_BELOW)
+        return "".join(output)
+
+    def draw(self, lines: list[str]) -> None:
+        """
+        This method writes a frame to the screen
+
+        Args:
+            self (Renderer)
+            lines (list[str]): The lines of the frame, without line breaks
+
+        Returns:
+            None
+        """
+        output = self.diff(lines)
+        self.frame = lines
+        if output:
+            stream = self.stream or sys.stdout
+            stream.write(output)
+            stream.flush()
+
+
+# The renderer of the terminal, shared by the list and the submenus
+SCREEN = Renderer()
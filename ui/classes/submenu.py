@@ -1,7 +1,7 @@
 from typing import Callable, Optional
 
-from constants import CLEAR_SCREEN, CURSOR_HOME, HIDE_CURSOR
 from helpers.text import bold
+from ui.classes.renderer import SCREEN
 
 
 class Submenu:
@@ -24,8 +24,6 @@ class Submenu:
         self.index = (self.index + 1) % len(self.options)
 
     def refresh(self):
-        print(HIDE_CURSOR + CLEAR_SCREEN + CURSOR_HOME, end="")
-
         def formatter(string: str) -> tuple[str, int]:
             length = len(string) + spacing
             bolded = bold(string.ljust(length))
@@ -35,14 +33,15 @@ class Submenu:
 
         headers = dict([formatter(head) for head in self.headers])
         header = f"  {' '.join(headers.keys())}"
-        print(header)
-        print("…" * len(header))
+        lines = [header, "…" * len(header)]
 
         for i, item in enumerate(self.options):
             prefix = "➤ " if i == self.index else "  "
             option = f"{item}"
-            print(f"{prefix}{option}")
-        print("\nUse ↑/↓ and press Enter", flush=True)
+            lines.append(f"{prefix}{option}")
+        lines.append("")
+        lines.append("Use ↑/↓ and press Enter")
+        SCREEN.draw(lines)
 
     def activate(self):
         option = self.options[self.index]
@@ -0,0 +1,214 @@
+import codecs
+import os
+import sys
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+# Necessary imports for windows and unix
+if os.name == "nt":
+    import msvcrt
+else:
+    import termios
+    import tty
+
+# Key sequences and the events they are evaluated to, other keys are returned as they are
+KEYS = {
+    "\x1b": "ESCAPE",
+    "\n": "RETURN",
+    "\r": "RETURN",
+    "q": "QUIT",
+    "\x0c": "CLEAR_SCREEN",
+    # Navigation
+    "\x1b[A": "UP",
+    "\x1bOA": "UP",
+    "k": "UP",
+    "\x1b[B": "DOWN",
+    "\x1bOB": "DOWN",
+    "j": "DOWN",
+    "\x1b[5~": "PAGE_UP",
+    "\x1b[6~": "PAGE_DOWN",
+    "\x1b[H": "TOP",
+    "\x1bOH": "TOP",
+    "\x1b[1~": "TOP",
+    "g": "TOP",
+    "\x1b[F": "BOTTOM",
+    "\x1bOF": "BOTTOM",
+    "\x1b[4~": "BOTTOM",
+    "G": "BOTTOM",
+}
+
+NAVIGATION = ("UP", "DOWN", "PAGE_UP", "PAGE_DOWN", "TOP", "BOTTOM")
+
+# Windows prefixes special keys with b"\xe0" instead of escape sequences
+WINDOWS_KEYS = {b"H": "UP", b"P": "DOWN", b"I": "PAGE_UP", b"Q": "PAGE_DOWN", b"G": "TOP", b"O": "BOTTOM"}
+
+# A lone escape is only the escape key if nothing follows it within this time (in seconds)
+ESCAPE_TIMEOUT = 0.05
+
+
+class KeyParser:
+    """
+    Incremental tokenizer for terminal input. Input can be fed in chunks of any size,
+    every key results in one event, even if several keys arrived at once (typeahead,
+    pasting). Incomplete escape sequences are kept until the rest arrives.
+    """
+    pending: str
+
+    def __init__(self) -> None:
+        self.pending = ""
+
+    def feed(self, data: str) -> list[str]:
+        """
+        This method tokenizes the input and returns the events of all complete keys
+
+        Args:
+            self (KeyParser)
+            data (str): The input that was read
+
+        Returns:
+            events (list[str]): The evaluated events, see KEYS
+        """
+        buffer = self.pending + data
+        events = []
+        i = 0
+        while i < len(buffer):
+            end = self._sequence_end(buffer, i)
+            if end is None:
+                break
+            token = buffer[i:end]
+            events.append(KEYS.get(token, token))
+            i = end
+        self.pending = buffer[i:]
+        return events
+
+    def flush(self) -> list[str]:
+        """
+        This method evaluates the incomplete input, once no more input followed it.
+        This is how the escape key is told apart from the start of an escape sequence.
+
+        Args:
+            self (KeyParser)
+
+        Returns:
+            events (list[str]): The events of the incomplete input
+        """
+        pending, self.pending = self.pending, ""
+        if not pending:
+            return []
+        # an escape key, possibly followed by the start of a sequence that never completed
+        return ["ESCAPE"] + self.feed(pending[1:]) + self.flush()
+
+    @staticmethod
+    def _sequence_end(buffer: str, start: int) -> Optional[int]:
+        # returns the end of the key starting at `start`, None if it is incomplete
+        if buffer[start] != "\x1b":
+            return start + 1
+        if start + 1 >= len(buffer):
+            return None
+
+        introducer = buffer[start + 1]
+        if introducer == "[":
+            # CSI: parameter bytes, then a single final byte
+            for i in range(start + 2, len(buffer)):
+                if "\x40" <= buffer[i] <= "\x7e":
+                    return i + 1
+                if not "\x20" <= buffer[i] <= "\x3f":
+                    # malformed, the escape is a key of its own
+                    return start + 1
+            return None
+        if introducer == "O":
+            return start + 3 if start + 2 < len(buffer) else None
+        # escape followed by a regular key, e.g. alt-x
+        return start + 1
+
+
+class TerminalSession:
+    """
+    Keeps the terminal in cbreak mode for as long as the session is entered and reads
+    the input in bulk. The input is tokenized by a KeyParser.
+    """
+    fd: int
+    settings: Optional[list]
+    parser: KeyParser
+    decoder: codecs.IncrementalDecoder
+
+    def __init__(self, fd: Optional[int] = None) -> None:
+        # stdin, unless another descriptor is given (e.g. a pipe in the tests)
+        self.fd = sys.stdin.fileno() if fd is None else fd
+        self.settings = None
+        self.parser = KeyParser()
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def __enter__(self) -> "TerminalSession":
+        if os.name != "nt":
+            self.settings = termios.tcgetattr(self.fd)
+            # Preserve ctrl-c capabilities
+            tty.setcbreak(self.fd)
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        if self.settings is not None:
+            termios.tcsetattr(self.fd, termios.TCSADRAIN, self.settings)
+            self.settings = None
+
+    @contextmanager
+    def suspended(self) -> Iterator[None]:
+        """
+        This method restores the normal terminal mode for the duration of the block, e.g. for input()
+
+        Args:
+            self (TerminalSession)
+
+        Returns:
+            context (Iterator[None])
+        """
+        settings = self.settings
+        self.__exit__()
+        try:
+            yield
+        finally:
+            if settings is not None:
+                self.__enter__()
+
+    def read_available(self) -> list[str]:
+        """
+        This method reads the available input without waiting, e.g. once an event loop
+        reported stdin as readable. An incomplete escape sequence stays in the parser,
+        it has to be flushed if nothing follows it within ESCAPE_TIMEOUT.
+
+        Args:
+            self (TerminalSession)
+
+        Returns:
+            events (list[str]): The evaluated events, see KEYS
+        """
+        data = os.read(self.fd, 4096)
+        if not data:
+            return ["QUIT"]
+        return self.parser.feed(self.decoder.decode(data))
+
+    def read_events(self) -> list[str]:
+        """
+        This method reads the keys that were pressed on windows, where the event loop can't
+        wait for the console and polls instead. Elsewhere the event loop waits for stdin
+        and calls read_available.
+
+        Args:
+            self (TerminalSession)
+
+        Returns:
+            events (list[str]): The evaluated events, see KEYS
+        """
+        events = []
+        while msvcrt.kbhit():
+            ch = msvcrt.getch()
+            if ch == b"\x1b":
+                events.append("ESCAPE")
+            elif ch == b"\xe0":  # Special key prefix
+                event = WINDOWS_KEYS.get(msvcrt.getch())
+                if event:
+                    events.append(event)
+            else:
+                events.extend(self.parser.feed(ch.decode("utf-8", errors="replace")))
+        return events
+
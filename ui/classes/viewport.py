@@ -0,0 +1,49 @@
+import shutil
+
+
+class Viewport:
+    """
+    The visible window of a list that is taller than the terminal. It follows the
+    selection, so drawing only has to render the rows in `window`.
+    """
+    rows: int       # height of the terminal
+    height: int     # number of list rows that fit on the screen, set by window
+    offset: int     # index of the first visible list row
+
+    def __init__(self) -> None:
+        self.height = 1
+        self.offset = 0
+        self.resize()
+
+    def resize(self) -> None:
+        """
+        This method queries the size of the terminal, e.g. after it was resized
+
+        Args:
+            self (Viewport)
+
+        Returns:
+            None
+        """
+        self.rows = shutil.get_terminal_size().lines
+
+    def window(self, selected: int, total: int, reserved: int) -> range:
+        """
+        This method scrolls the viewport so the selected row is visible
+
+        Args:
+            self (Viewport)
+            selected (int): The index of the selected row
+            total (int): The number of rows of the list
+            reserved (int): The number of terminal lines used by everything but the list
+
+        Returns:
+            window (range): The indexes of the visible rows
+        """
+        self.height = max(1, self.rows - reserved)
+        if selected < self.offset:
+            self.offset = selected
+        elif selected >= self.offset + self.height:
+            self.offset = selected - self.height + 1
+        self.offset = max(0, min(self.offset, total - self.height))
+        return range(self.offset, min(total, self.offset + self.height))
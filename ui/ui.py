@@ -1,39 +1,62 @@
+import asyncio
+import io
 import os
-import sys
-import select
-import array
+import signal
 
-from typing import Optional
+from contextlib import redirect_stdout
+from typing import Any, Coroutine, Optional
 
 from classes.application import App
-from constants import CLEAR_SCREEN, CURSOR_HOME, DEBUG, HIDE_CURSOR, SHOW_CURSOR
+from classes.clock import CLOCK
+from classes.habit import BEST_WINDOW, CACHE_STATS, RATE_WINDOWS
+from constants import CLEAR_SCREEN, CURSOR_HOME, DEBUG, SHOW_CURSOR
 from helpers.text import bold, bold_underline, blue
+from ui.classes.frames import FrameScheduler
+from ui.classes.renderer import SCREEN
 from ui.classes.submenu import ConfirmSubmenu, Submenu
-
-# Necessary imports for windows and unix
-if os.name == "nt":
-    import msvcrt
-else:
-    import fcntl
-    import tty
-    import termios
+from ui.classes.terminal import ESCAPE_TIMEOUT, NAVIGATION, TerminalSession
+from ui.classes.viewport import Viewport
+
+# Frames drawn per second at most, bursts of input are coalesced into these
+FRAME_RATE = 30
+# Seconds between the background saves, if there is anything to save
+SAVE_INTERVAL = 30.0
+# The rollover job sleeps until the next interval boundary, but at most this many
+# seconds, since the sleep does not follow jumps of the wall clock (e.g. a suspend)
+MAX_ROLLOVER_SLEEP = 300.0
+# Number of habits a background job handles before it yields to the input handling
+CHUNK_SIZE = 256
+# Number of screen pages whose statistics are computed ahead of time, starting with the visible one
+WARM_PAGES = 2
 
 
 class UI:
     submenu: Optional[Submenu]
     app: App
     index: int
-
-    def __init__(self, app: App) -> None:
+    session: TerminalSession
+    coalesce: bool  # whether a batch of navigation keys is drawn once instead of once per key
+    frames: FrameScheduler
+    tasks: set[asyncio.Task]  # the running background jobs
+    done: Optional[asyncio.Future]  # resolved once the mainloop should terminate
+    escape: Optional[asyncio.TimerHandle]  # flushes an incomplete escape sequence
+
+    def __init__(self, app: App, coalesce: bool = True, session: Optional[TerminalSession] = None) -> None:
         self.app = app
         self.index = 0
         self.submenu = None
+        self.session = session or TerminalSession()
+        self.coalesce = coalesce
+        self.frames = FrameScheduler(self.redraw, FRAME_RATE)
+        self.tasks = set()
+        self.done = None
+        self.escape = None
         UiHelpers.draw_list(self.app, self.index)
 
     def main_loop(self) -> None:
         """
-        This method is the mainloop for the ui. In it, it will wait for a user
-        input and execute the requested action
+        This method is the mainloop for the ui. It runs an event loop, which executes
+        the actions of the user input and the background jobs (saving, rollover, statistics)
 
         Args:
             self (UI)
@@ -41,85 +64,252 @@ class UI:
             None
         """
         try:
-            while True:
-                key = self.get_keypress()
-                _break = self.eval_action(key)
-                if _break:
-                    break
+            with self.session:
+                asyncio.run(self.run())
         finally:
+            self.app.close()
             print(SHOW_CURSOR, end="", flush=True)
 
-    def get_keypress(self) -> Optional[str]:
+    async def run(self) -> None:
         """
-        For windows:
-        This method reads the current keypress from stdin
-        For Unix:
-        This method first blockingly polls the stdin file descriptor. Then it returns the evaluated key
+        This method waits for input and runs the background jobs until the user quits.
+        Keys are handled as soon as they arrive, the jobs yield to them regularly.
 
         Args:
             self (UI)
         Returns:
-            event (Optional[str]): The evaluated event or the key pressed. Can be none
+            None
         """
+        loop = asyncio.get_running_loop()
+        self.done = loop.create_future()
         if os.name == "nt":
-            if msvcrt.kbhit():
-                ch = msvcrt.getch()
-                if not ch:
-                    return
+            # the windows event loop can't wait for the console
+            self.spawn(self.poll_input())
+        else:
+            loop.add_reader(self.session.fd, self.on_input)
+            loop.add_signal_handler(signal.SIGWINCH, self.on_resize)
+        self.spawn(self.save_periodically())
+        self.spawn(self.rollover_periodically())
+        self.spawn(self.warm_stats())
+
+        try:
+            await self.done
+        finally:
+            if os.name != "nt":
+                loop.remove_reader(self.session.fd)
+                loop.remove_signal_handler(signal.SIGWINCH)
+            self.frames.cancel()
+            for task in self.tasks:
+                task.cancel()
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    def spawn(self, job: Coroutine[Any, Any, None]) -> None:
+        # a failing job terminates the mainloop with its exception
+        task = asyncio.create_task(job)
+        self.tasks.add(task)
+        task.add_done_callback(self.on_job_done)
+
+    def on_job_done(self, task: asyncio.Task) -> None:
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception() and self.done and not self.done.done():
+            self.done.set_exception(task.exception())
+
+    def on_input(self) -> None:
+        # stdin is readable
+        if self.escape:
+            self.escape.cancel()
+            self.escape = None
+        self.dispatch(self.session.read_available())
+        if self.session.parser.pending:
+            self.escape = asyncio.get_running_loop().call_later(ESCAPE_TIMEOUT, self.on_escape)
+
+    def on_escape(self) -> None:
+        # nothing followed the escape, so it was the escape key
+        self.escape = None
+        self.dispatch(self.session.parser.flush())
+
+    async def poll_input(self) -> None:
+        while True:
+            self.dispatch(self.session.read_events())
+            await asyncio.sleep(0.01)
+
+    def dispatch(self, events: list[str]) -> None:
+        if self.handle_events(events) and self.done and not self.done.done():
+            self.done.set_result(None)
+
+    def handle_events(self, events: list[str]) -> bool:
+        """
+        This method executes the actions of all keys that were read at once. In coalesce
+        mode, navigation only moves the cursor and the next frame shows the result.
+
+        Args:
+            self (UI)
+            events (list[str]): The events returned by the TerminalSession
+
+        Returns:
+            _break (bool): Whether the app mainloop should terminate
+        """
+        for event in events:
+            if self.coalesce and event in NAVIGATION:
+                if self.navigate(event):
+                    self.frames.request()
+                continue
+            shown = SCREEN.frame is not None
+            if self.eval_action(event):
+                return True
+            # the action replaced the list by a screen that was not drawn by the renderer, e.g. the help.
+            # Frames requested while such a screen is shown (e.g. by a toggle) draw the list again
+            if shown and SCREEN.frame is None:
+                self.frames.cancel()
+        return False
+
+    async def save_periodically(self) -> None:
+        """
+        This method is a background job, it regularly writes a full snapshot, e.g. to
+        compact the journal. The snapshot file is written without blocking the input.
+
+        Args:
+            self (UI)
+        Returns:
+            None
+        """
+        while True:
+            await asyncio.sleep(SAVE_INTERVAL)
+            if self.app.get_store().backlog():
+                await self.app.save_async()
+
+    async def rollover_periodically(self) -> None:
+        """
+        This method is a background job, it sleeps until the next interval boundary and
+        then rolls over the habits of the intervals that ended
+
+        Args:
+            self (UI)
+        Returns:
+            None
+        """
+        while True:
+            await asyncio.sleep(min(self.app.scheduler.delay(CLOCK.today()), MAX_ROLLOVER_SLEEP))
+            today = CLOCK.today()
+            habits = self.app.due_habits(today)
+            if not habits:
+                continue
+
+            for i in range(0, len(habits), CHUNK_SIZE):
+                self.app.rollover(habits[i : i + CHUNK_SIZE], today)
+                await asyncio.sleep(0)
+            if SCREEN.frame is not None:
+                self.frames.request()
+            self.spawn(self.warm_stats())
+
+    async def warm_stats(self) -> None:
+        """
+        This method is a background job, it computes the statistics shown for the visible
+        habits and the next page ahead of time, so navigating only reads them from the
+        aggregate caches. Habits further away are left alone, their histories might not
+        even be loaded yet.
+
+        Args:
+            self (UI)
+        Returns:
+            None
+        """
+        viewport = UiHelpers.viewport
+        options = self.app.filter.tmp
+        stop = min(len(options), viewport.offset + WARM_PAGES * viewport.height)
+        # habits may be removed or filtered out while the job yields, so the uids are taken up front
+        uids = [options.at(index).uid for index in range(viewport.offset, stop)]
+        for start in range(0, len(uids), CHUNK_SIZE):
+            for uid in uids[start : start + CHUNK_SIZE]:
+                habit = self.app.filter.base.get(uid)
+                if habit is None:
+                    continue
+                habit.completion_rate()
+                for size in RATE_WINDOWS:
+                    habit.window_rate(size)
+                habit.best_rate(BEST_WINDOW)
+                habit.ui_history("  ")
+                habit.ui_history(max_rows=1)
+            await asyncio.sleep(0)
+
+    def navigate(self, action: str) -> bool:
+        """
+        This method moves the cursor of the list or the open submenu without redrawing
+
+        Args:
+            self (UI)
+            action (str): One of the NAVIGATION events
+
+        Returns:
+            moved (bool): Whether the screen has to be redrawn
+        """
+        if self.submenu:
+            match action:
+                case "UP":
+                    self.submenu.up()
+                case "DOWN":
+                    self.submenu.down()
+                case _:
+                    return False
+            return True
 
-                if ch == b"\x1b":
-                    return "ESCAPE"
-                elif ch == b"\xe0":  # Special key prefix
-                    ch2 = msvcrt.getch()
-                    if ch2 == b"H":
-                        return "UP"
-                    elif ch2 == b"P":
-                        return "DOWN"
-                elif ch == b"\r":
-                    return "RETURN"
-                elif ch == b"k":
-                    return "UP"
-                elif ch == b"j":
-                    return "DOWN"
-                elif ch == b"q":
-                    return "QUIT"
-                elif ch == b"\x0c":
-                    return "CLEAR_SCREEN"
-                else:
-                    return ch.decode("utf-8")
+        filter_len = len(self.app.filter.tmp)
+        if filter_len == 0:
+            return False
+        page = UiHelpers.viewport.height
+        match action:
+            case "UP":
+                self.index = (self.index - 1) % filter_len
+            case "DOWN":
+                self.index = (self.index + 1) % filter_len
+            case "PAGE_UP":
+                self.index = max(self.index - page, 0)
+            case "PAGE_DOWN":
+                self.index = min(self.index + page, filter_len - 1)
+            case "TOP":
+                self.index = 0
+            case "BOTTOM":
+                self.index = filter_len - 1
+        return True
+
+    def redraw(self) -> None:
+        if self.submenu:
+            self.submenu.refresh()
         else:
-            fd = sys.stdin.fileno()
-            old_settings = termios.tcgetattr(fd)
-            try:
-                # Preserve ctrl-c capabilities
-                tty.setcbreak(fd)
-
-                # poll file descriptor for stdin blockingly for efficiency
-                _, _, _ = select.select([sys.stdin], [], [])
-                num_bytes = UiHelpers.get_available_bytes(fd)
-                chars = sys.stdin.read(num_bytes)
-
-                match chars:
-                    case "\x1b":
-                        return "ESCAPE"
-                    case "\n" | "\r":
-                        return "RETURN"
-                    case "q":
-                        return "QUIT"
-                    case "\x0c":
-                        return "CLEAR_SCREEN"
-
-                    # Navigation
-                    case "\x1b[A" | "k":
-                        return "UP"
-                    case "\x1b[B" | "j":
-                        return "DOWN"
-
-                    # Return keys
-                    case _:
-                        return chars
-            finally:
-                termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
+            UiHelpers.draw_list(self.app, self.index)
+
+    def on_resize(self) -> None:
+        """
+        This method is the SIGWINCH handler, it redraws the screen for the new terminal size.
+        Screens that were not drawn by the renderer (help, statistics) are left alone.
+
+        Args:
+            self (UI)
+
+        Returns:
+            None
+        """
+        UiHelpers.viewport.resize()
+        if SCREEN.frame is None:
+            return
+        SCREEN.invalidate()
+        self.frames.request()
+
+    def follow(self, uid: str) -> None:
+        """
+        This method moves the cursor to a habit, e.g. after it was moved by sorting.
+        The cursor stays where it is if the habit is not shown anymore.
+
+        Args:
+            self (UI)
+            uid (str): The uid of the habit
+
+        Returns:
+            None
+        """
+        index = self.app.index_of(uid)
+        if index is not None:
+            self.index = index
 
     def eval_action(self, action: Optional[str]) -> Optional[bool]:
         """
@@ -128,7 +318,7 @@ class UI:
 
         Args:
             self (UI)
-            action (Optional[str]): Takes the output from self.get_keypress
+            action (Optional[str]): An event returned by TerminalSession.read_available or read_events
 
         Returns:
             _break (Optional[bool]): In some cases, we want to terminate the
@@ -138,52 +328,37 @@ class UI:
             return False
 
         match action:
-            case "UP":
-                if self.submenu:
-                    self.submenu.up()
-                    self.submenu.refresh()
-                else:
-                    filter_len = len(self.app.filter.tmp)
-                    if not filter_len == 0:
-                        self.index = (self.index - 1) % filter_len
-                        UiHelpers.draw_list(self.app, self.index)
-
-            case "DOWN":
-                if self.submenu:
-                    self.submenu.down()
-                    self.submenu.refresh()
-                else:
-                    filter_len = len(self.app.filter.tmp)
-                    if not filter_len == 0:
-                        self.index = (self.index + 1) % filter_len
-                        UiHelpers.draw_list(self.app, self.index)
+            case "UP" | "DOWN" | "PAGE_UP" | "PAGE_DOWN" | "TOP" | "BOTTOM":
+                if self.navigate(action):
+                    self.redraw()
 
             case "RETURN":
                 if self.submenu:
                     self.submenu.activate()
                     self.submenu = None
-                    UiHelpers.draw_list(self.app, self.index)
+                    self.frames.request()
 
             case "ESCAPE":
                 if self.submenu:
                     self.submenu = None
-                    UiHelpers.draw_list(self.app, self.index)
+                    self.frames.request()
 
             case "c":
                 selected = self.app.habit_at_index(self.index)
                 if not selected:
                     return
-                selected.toggle_completed()
-                self.app.filter.apply_filter()
-                UiHelpers.draw_list(self.app, self.index)
-                self.app.save()
+                self.app.toggle_habit(selected)
+                self.follow(selected.uid)
+                self.frames.request()
 
             case "o":
+                SCREEN.invalidate()
                 print(SHOW_CURSOR + CLEAR_SCREEN + CURSOR_HOME, end="")
                 print(
                     "To exit press <Return> and then <Esc> once you're in the interval selection"
                 )
-                name = input("Habit name:\n")
+                with self.session.suspended():
+                    name = input("Habit name:\n")
 
                 # callback function to add a new habit
                 def on_confirm(option: str):
@@ -201,16 +376,14 @@ class UI:
                         habit = self.app.habit_at_index(self.index)
                         if not habit:
                             return
-                        uid = habit.uid
-                        self.app.filter.base.pop(uid)
-                        self.app.filter.tmp.pop(uid)
-                        self.app.save()
-                        UiHelpers.draw_list(self.app, self.index)
+                        self.app.remove_habit(habit.uid)
+                        self.frames.request()
 
                 self.submenu = ConfirmSubmenu(on_confirm)
 
             case "f":
                 # filter
+                selected = self.app.habit_at_index(self.index)
                 def on_confirm(option: str):
                     match option:
                         case "Completed":
@@ -221,13 +394,16 @@ class UI:
                             self.app.filter.apply_filter("all")
                         case "Daily" | "Weekly" | "Monthly":
                             self.app.filter.apply_filter(option)
-                    UiHelpers.draw_list(self.app, self.index)
+                    if selected:
+                        self.follow(selected.uid)
+                    self.frames.request()
 
                 options = ["All", "Completed", "Not Completed", "Daily", "Weekly", "Monthly"]
                 self.submenu = Submenu(options, ["Filter"], on_confirm)
 
             case "s":
                 # sort
+                selected = self.app.habit_at_index(self.index)
                 def on_confirm(option: str):
                     match option:
                         case "Name ↓":
@@ -246,7 +422,13 @@ class UI:
                             self.app.filter.apply_sorting("comp_rate_desc")
                         case "Completion Rate ↑":
                             self.app.filter.apply_sorting("comp_rate")
-                    UiHelpers.draw_list(self.app, self.index)
+                        case "Last 30 Rate ↓":
+                            self.app.filter.apply_sorting("rate_30_desc")
+                        case "Last 30 Rate ↑":
+                            self.app.filter.apply_sorting("rate_30")
+                    if selected:
+                        self.follow(selected.uid)
+                    self.frames.request()
 
                 options = [
                     "Name ↓",
@@ -257,6 +439,8 @@ class UI:
                     "Streak ↑",
                     "Completion Rate ↓",
                     "Completion Rate ↑",
+                    "Last 30 Rate ↓",
+                    "Last 30 Rate ↑",
                 ]
                 self.submenu = Submenu(options, ["Sorting"], on_confirm)
 
@@ -284,6 +468,8 @@ class UI:
 
 
 class UiHelpers:
+    viewport: Viewport = Viewport()
+
     def __init__(self) -> None:
         pass
 
@@ -302,6 +488,8 @@ class UiHelpers:
             # Navigation
             "k/↑": "Navigate up",
             "j/↓": "Navigate down",
+            "PgUp/PgDn": "Scroll one page",
+            "g/G": "Jump to the first/last habit",
             "q": "Quit",
             "ctrl-l": "Clear additional information",
             # Habit actions
@@ -314,7 +502,7 @@ class UiHelpers:
             "s": "Sort the habits",
             "f": "Filter the habits",
         }
-        left_spacing = 10
+        left_spacing = 12
 
         print(f"{bold_underline('Available Commands')}")
         for bind, expl in binds.items():
@@ -331,23 +519,9 @@ class UiHelpers:
         Returns:
             None
         """
+        SCREEN.invalidate()
         os.system("cls" if os.name == "nt" else "clear")
 
-    @classmethod
-    def get_available_bytes(cls, fd: int) -> int:
-        """
-        This method is unix only and returns the number of bytes contained in the current stdin buffer
-
-        Args:
-            cls (UiHelpers)
-
-        Returns:
-            bytes (int): Number of bytes present in stdin
-        """
-        buf = array.array("i", [0])
-        fcntl.ioctl(fd, termios.FIONREAD, buf)
-        return buf[0]
-
     @classmethod
     def draw_list(cls, app: App, selected: int):
         """
@@ -359,8 +533,10 @@ class UiHelpers:
             selected (int): The index of the currently selected habit
 
         Returns:
+            None
         """
         options = app.filter.tmp
+        options_len = len(options)
         spacing = 2
 
         def formatter(string: str) -> tuple[str, int]:
@@ -368,9 +544,31 @@ class UiHelpers:
             bolded = bold(string.ljust(length))
             return (bolded, length)
 
-        print(HIDE_CURSOR + CLEAR_SCREEN + CURSOR_HOME, end="")
-        if len(options) > 0:
-            max_len = max([len(item.name) for (_, item) in options.items()]) + spacing
+        # Verify selected is always set, even if it's out of bounds
+        if options_len <= selected:
+            selected = options_len - 1
+
+        # Show inspect mode, it prints its lines so they are captured for the frame
+        footer = [""]
+        if habit := app.habit_at_index(selected):
+            block = io.StringIO()
+            with redirect_stdout(block):
+                habit.inspect_self()
+            footer.extend(block.getvalue().splitlines())
+
+        footer.append("")
+        footer.append(f"  Use ↑/↓ to navigate")
+        footer.append(f"  Or press \"{blue('h')}\" to show more commands")
+        if DEBUG:
+            footer.append(f"  Cache hit rate: {CACHE_STATS}")
+
+        # Only the habits that fit on the screen are rendered, the header,
+        # the position indicator and the footer take the other lines
+        visible = cls.viewport.window(max(selected, 0), options_len, len(footer) + 3)
+        items = [options.at(i) for i in visible]
+
+        if items:
+            max_len = max([len(item.name) for item in items]) + spacing
         else:
             max_len = len("Name") + spacing
 
@@ -378,25 +576,20 @@ class UiHelpers:
         completed_tag, completed_len = formatter("Done")
         name_tag = bold("Name".ljust(max_len))
 
-        print(f"  {completed_tag}{name_tag}{history_tag}")
-        print("…" * (max_len + completed_len + history_len + spacing))
-        options_len = len(options)
-        for i, (_, item) in enumerate(options.items()):
-            # Verify selected is always set, even if it's out of bounds
-            if options_len <= selected:
-                selected = options_len - 1
+        lines = [
+            f"  {completed_tag}{name_tag}{history_tag}",
+            "…" * (max_len + completed_len + history_len + spacing),
+        ]
+        for i, item in zip(visible, items):
             prefix = "➤ " if i == selected else "  "
 
             # done = "[x]" if item.completed else "[ ]"
             # done = COMPLETED if item.completed else INCOMPLETE
             done = "☑" if item.completed else "☐"
             option = f"{done.ljust(completed_len)}{item.name.ljust(max_len)}{item.ui_history(max_rows=1)}"
-            print(f"{prefix}{option}")
-
-        # Show inspect mode
-        print()
-        if habit := app.habit_at_index(selected):
-            habit.inspect_self()
+            lines.append(f"{prefix}{option}")
 
-        print(f"\n  Use ↑/↓ to navigate", flush=True)
-        print(f"  Or press \"{blue('h')}\" to show more commands", flush=True)
+        if len(visible) < options_len:
+            lines.append(f"  {visible.start + 1}-{visible.stop} of {options_len}")
+        lines.extend(footer)
+        SCREEN.draw(lines)